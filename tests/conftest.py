@@ -0,0 +1,16 @@
+import pytest
+from tests.synthetic import get_views, render_images
+
+
+@pytest.fixture(scope='session')
+def views():
+    """Object points and image points of both cameras of 12 poses."""
+    return get_views(12)
+
+
+@pytest.fixture(scope='session')
+def image_folder(tmp_path_factory):
+    """Folder with 8 images of a chessboard."""
+    folder = tmp_path_factory.mktemp('images')
+    render_images(str(folder), 8)
+    return folder
@@ -0,0 +1,65 @@
+# Synthetic poses of a chessboard seen by a stereo pair with known parameters
+import os
+import cv2
+import numpy as np
+from toolboxClass.miscTools.detection_tools import CHESSBOARD, \
+    get_object_pattern
+
+CAMERA_MATRIX = np.array([[800.0, 0.0, 320.0], [0.0, 800.0, 240.0],
+                          [0.0, 0.0, 1.0]])
+DIST_COEFS = np.array([[-0.1], [0.05], [0.0], [0.0], [0.0]])
+# (height, width) of the images
+SIZE = (480, 640)
+R_STEREO = cv2.Rodrigues(np.array([0.0, 0.05, 0.0]))[0]
+T_STEREO = np.array([[-100.0], [0.0], [0.0]])
+
+
+def get_views(n, seed=0, noise=0.1):
+    """Function to get the object points and the image points of both cameras of n random poses of a 9 x 6 chessboard."""
+    rng = np.random.RandomState(seed)
+    op = get_object_pattern(CHESSBOARD, 9, 6, 50)
+    center = op.mean(axis=0)
+    imgpoints = [[], []]
+    for _ in range(n):
+        rvec = rng.uniform(-0.4, 0.4, 3)
+        R = cv2.Rodrigues(rvec)[0]
+        tvec = -R.dot(center) + [rng.uniform(-60, 60),
+                                 rng.uniform(-60, 60),
+                                 rng.uniform(900, 1300)]
+        for j, (r, t) in enumerate([(R, tvec),
+                                    (R_STEREO.dot(R),
+                                     R_STEREO.dot(tvec) + T_STEREO.ravel())]):
+            ip, _ = cv2.projectPoints(op, cv2.Rodrigues(r)[0], t,
+                                      CAMERA_MATRIX, DIST_COEFS)
+            ip += rng.normal(0, noise, ip.shape)
+            imgpoints[j].append(ip.astype(np.float32))
+    return [op] * n, imgpoints
+
+
+
+def render_images(folder, n, seed=0):
+    """Function to write n images of a chessboard with 9 x 6 inner corners in random poses, seen by the first camera."""
+    rng = np.random.RandomState(seed)
+    square = 40
+    board = np.full((9 * square, 12 * square), 255, np.uint8)
+    for r in range(7):
+        for c in range(10):
+            if (r + c) % 2 == 0:
+                board[square * (r + 1):square * (r + 2),
+                      square * (c + 1):square * (c + 2)] = 0
+    h, w = board.shape
+    corners = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    op = np.float32([[0, 0, 0], [w, 0, 0], [w, h, 0], [0, h, 0]])
+    names = []
+    for i in range(n):
+        rvec = rng.uniform(-0.4, 0.4, 3)
+        tvec = np.array([-w / 2 + rng.uniform(-60, 60),
+                         -h / 2 + rng.uniform(-60, 60),
+                         rng.uniform(900, 1300)])
+        ip, _ = cv2.projectPoints(op, rvec, tvec, CAMERA_MATRIX, DIST_COEFS)
+        H = cv2.getPerspectiveTransform(corners,
+                                        ip.reshape(4, 2).astype(np.float32))
+        image = cv2.warpPerspective(board, H, SIZE[::-1], borderValue=128)
+        names.append(os.path.join(folder, 'img_%02d.png' % i))
+        cv2.imwrite(names[-1], image)
+    return names
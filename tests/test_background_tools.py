@@ -0,0 +1,60 @@
+import time
+from toolboxClass.miscTools.background_tools import BackgroundJob
+
+
+class MainLoop:
+    """Stand-in for the Tk main loop, it runs the callbacks scheduled with after."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def run(self, timeout=10):
+        end = time.time() + timeout
+        while self.callbacks and time.time() < end:
+            time.sleep(0.001)
+            self.callbacks.pop(0)()
+        assert not self.callbacks
+
+
+def run_job(function):
+    loop = MainLoop()
+    events = []
+    done = []
+    job = BackgroundJob(loop, function, on_event=events.extend,
+                        on_done=lambda *args: done.append(args), poll_ms=1)
+    job.start()
+    return job, loop, events, done
+
+
+def test_events_and_result_reach_the_main_loop():
+    def function(post, cancelled):
+        for i in range(5):
+            post(i)
+        return 'result'
+    job, loop, events, done = run_job(function)
+    loop.run()
+    assert events == list(range(5))
+    assert done == [('result', None)]
+    assert not job.is_running()
+
+
+def test_errors_are_given_to_on_done():
+    def function(post, cancelled):
+        raise ValueError('failed')
+    _, loop, _, done = run_job(function)
+    loop.run()
+    assert done[0][0] is None and isinstance(done[0][1], ValueError)
+
+
+def test_cancel():
+    def function(post, cancelled):
+        while not cancelled.wait(0.01):
+            pass
+        return 'cancelled'
+    job, loop, _, done = run_job(function)
+    job.cancel()
+    loop.run()
+    assert done == [('cancelled', None)]
@@ -0,0 +1,160 @@
+import threading
+import numpy as np
+from toolboxClass import _Calibration
+from toolboxClass.miscTools.calibration_tools import ClusterCalibration, \
+    MIN_SUBSETS, N_CAMERA_PARAMETERS, calibrate_subset, \
+    calibrate_with_uncertainty, get_offset, get_tolerances
+from toolboxClass.miscTools.time_tools import chronometer
+from tests.synthetic import CAMERA_MATRIX, R_STEREO, SIZE, T_STEREO
+
+
+def get_calibration(views, n_workers=1, seed=1, k=4, **kwargs):
+    objpoints, imgpoints = views
+    return ClusterCalibration(objpoints, imgpoints[:1], [SIZE], 0, k, 6,
+                              False, n_workers, seed=seed, **kwargs)
+
+
+def calibrate(views, n_workers=1, seed=1, k=4, **kwargs):
+    calibration = get_calibration(views, n_workers, seed, k, **kwargs)
+    calibration.calibrate()
+    calibration.average()
+    return calibration
+
+
+def test_worker_processes_give_the_same_results(views):
+    serial = calibrate(views, keep_subsets=True)
+    parallel = calibrate(views, n_workers=2, keep_subsets=True)
+    assert serial.n_calibrated == parallel.n_calibrated
+    np.testing.assert_array_equal(serial.samples, parallel.samples)
+    np.testing.assert_allclose(serial.camera_matrix, parallel.camera_matrix)
+    np.testing.assert_allclose(serial.dist_coefs, parallel.dist_coefs)
+
+
+def test_background_calibration_posts_its_progress(views):
+    events = []
+    calibration = _Calibration.Mixin().run_clustering(
+        get_calibration(views), chronometer(), events.append,
+        threading.Event())
+    assert calibration.camera_matrix is not None
+    progress = [e[1] for e in events if e[0] == 'progress']
+    assert progress[-1] == 4 and progress == sorted(progress)
+    assert [e[0] for e in events if e[0] in ('step', 'stop')] == \
+        ['step', 'stop', 'step']
+
+
+def test_cancelled_calibration(views):
+    cancelled = threading.Event()
+    cancelled.set()
+    calibration = get_calibration(views)
+    assert _Calibration.Mixin().run_clustering(
+        calibration, chronometer(), lambda event: None, cancelled) is None
+    assert calibration.stop_reason == 'cancelled'
+    assert calibration.n_calibrated == 1
+
+
+def test_warm_start_starts_from_all_the_poses(views):
+    calibration = calibrate(views, warm_start=True)
+    c, d = calibration.guess
+    np.testing.assert_allclose(c[0], CAMERA_MATRIX, atol=5)
+    np.testing.assert_allclose(calibration.camera_matrix[0], CAMERA_MATRIX,
+                               atol=5)
+    assert calibration.time_warm_start > 0
+
+
+def test_stops_when_converged(views):
+    calibration = calibrate(views, k=50, tolerances=(1000, 1000, 1000))
+    assert calibration.stop_reason == 'converged'
+    assert calibration.statistics.count == MIN_SUBSETS
+
+
+def test_stops_at_the_time_budget(views):
+    calibration = calibrate(views, k=50, time_budget=1e-6)
+    assert calibration.stop_reason == 'time budget'
+    assert calibration.n_calibrated == 1
+
+
+def test_tolerances_of_each_parameter():
+    tolerances = get_tolerances(2, True, 1, 0.01, 2)
+    assert len(tolerances) == 2 * N_CAMERA_PARAMETERS + 3
+    np.testing.assert_array_equal(tolerances[:9],
+                                  [1] * 4 + [0.01] * 5)
+    np.testing.assert_array_equal(tolerances[-3:], [2] * 3)
+
+
+def test_subsets_are_kept_only_for_the_export(views):
+    calibration = calibrate(views)
+    assert calibration.subsets == [] and len(calibration.samples) == 0
+    kept = calibrate(views, keep_subsets=True)
+    np.testing.assert_array_equal(kept.camera_matrix,
+                                  calibration.camera_matrix)
+    assert len(kept.samples) == kept.statistics.count == 4
+    # the averaged parameters are the mean of the exported ones
+    np.testing.assert_allclose(np.mean(kept.fx_array[0]),
+                               kept.camera_matrix[0][0][0])
+    np.testing.assert_allclose(np.std(kept.k1_array[0]),
+                               kept.dev_dist_coefs[0][0][0])
+    np.testing.assert_allclose(np.mean(kept.RMS_array),
+                               kept.rms_statistics.mean)
+
+
+def test_stereo_averages_R_and_T(views):
+    objpoints, imgpoints = views
+    calibration = ClusterCalibration(objpoints, imgpoints, [SIZE, SIZE], 0,
+                                     3, 6, True, seed=1, keep_subsets=True)
+    calibration.calibrate()
+    calibration.average()
+    np.testing.assert_allclose(calibration.R_stereo, R_STEREO, atol=1e-2)
+    np.testing.assert_allclose(calibration.T_stereo, T_STEREO, atol=2)
+    np.testing.assert_allclose(np.mean(calibration.T_array, axis=0),
+                               calibration.T_stereo)
+    assert calibration.R_array.shape == (3, 3, 3)
+
+
+def test_calibration_with_uncertainty(views):
+    objpoints, imgpoints = views
+    rms, c, d, dev_c, dev_d, R, T, rvecs, tvecs, errors = \
+        calibrate_with_uncertainty(objpoints, imgpoints, [SIZE, SIZE], 0,
+                                   True)
+    assert rms < 0.5
+    for j in range(2):
+        np.testing.assert_allclose(c[j], CAMERA_MATRIX, atol=5)
+        # the true parameters are within a few standard deviations
+        assert np.all(np.abs(c[j] - CAMERA_MATRIX) <= 5 * dev_c[j] + 1e-9)
+        assert dev_d[j].shape == (5, 1)
+        assert len(rvecs[j]) == len(objpoints)
+        assert len(errors[j]) == len(objpoints)
+    np.testing.assert_allclose(T, T_STEREO, atol=5)
+
+
+def test_resolution_offset_of_a_mixed_resolution_pair():
+    size = [(480, 640), (960, 1280)]
+    assert get_offset([(480, 640)] * 2, True) is None
+    assert get_offset(size, False) is None
+    offset = get_offset(size, True)
+    assert offset.index_min == 0
+    imgpoints = [np.zeros((2, 54, 1, 2), np.float32),
+                 np.ones((2, 54, 1, 2), np.float32)]
+    shifted = offset.shift_points(imgpoints)
+    assert shifted[0].dtype == np.float32
+    # the (x, y) points are centered in the bigger images
+    np.testing.assert_array_equal(shifted[0][..., 0], 320)
+    np.testing.assert_array_equal(shifted[0][..., 1], 240)
+    assert shifted[1] is imgpoints[1]
+    # the principal point is moved back
+    camera_matrices = [CAMERA_MATRIX + [[0, 0, 320], [0, 0, 240], [0, 0, 0]],
+                       CAMERA_MATRIX.copy()]
+    offset.correct_camera_matrices(camera_matrices)
+    np.testing.assert_array_equal(camera_matrices[0], CAMERA_MATRIX)
+
+
+def test_two_stage_stereo_calibration(views):
+    objpoints, imgpoints = views
+    joint = calibrate_subset(objpoints, imgpoints, [SIZE, SIZE], 0, True)
+    two_stage = calibrate_subset(objpoints, imgpoints, [SIZE, SIZE], 0, True,
+                                 two_stage=True)
+    for rms, c, d, R, T in (joint, two_stage):
+        assert rms < 0.5
+        for c_j in c:
+            np.testing.assert_allclose(c_j, CAMERA_MATRIX, atol=5)
+        np.testing.assert_allclose(R, R_STEREO, atol=1e-2)
+        np.testing.assert_allclose(T, T_STEREO, atol=5)
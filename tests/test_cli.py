@@ -0,0 +1,59 @@
+import json
+import numpy as np
+import pytest
+from toolboxClass import cli
+
+
+@pytest.fixture(scope='module')
+def features(image_folder, tmp_path_factory):
+    """Folder with the features detected by the detect command."""
+    folder = tmp_path_factory.mktemp('features')
+    assert cli.main(['detect', '-W', '9', '-H', '6', '-d', '50', '-o',
+                     str(folder), '--no-cache', str(image_folder)]) == 0
+    return folder
+
+
+def test_detect_finds_all_the_poses(features):
+    op, imgpoints, size, info = cli.load_detection(str(features))
+    assert size == [(480, 640)]
+    assert len(imgpoints[0]) == 8
+    assert all(ip.shape == (54, 1, 2) for ip in imgpoints[0])
+    assert op.shape == (54, 1, 3)
+
+
+def test_calibrate_and_export(features, tmp_path):
+    results = str(tmp_path / 'results.npz')
+    assert cli.main(['calibrate', '-k', '3', '-r', '6', '--seed', '1',
+                     '-o', results, str(features)]) == 0
+    with np.load(results) as r:
+        np.testing.assert_allclose(r['camera_matrix'][0][0][0], 800, rtol=0.05)
+        assert 'samples' not in r
+    assert cli.main(['export', '-o', str(tmp_path / 'parameters'),
+                     results]) == 0
+    assert (tmp_path / 'parameters' / 'intrinsics_first_camera.txt').exists()
+
+
+def test_calibrate_saves_the_subsets(features, tmp_path):
+    results = str(tmp_path / 'results.npz')
+    assert cli.main(['calibrate', '-k', '3', '-r', '6', '--seed', '1',
+                     '--save-subsets', '-o', results, str(features)]) == 0
+    with np.load(results) as r:
+        assert r['samples'].shape == (3, 6)
+        assert len(r['rms_array']) == 3
+
+
+def test_calibrate_rejects_k_below_one(features, tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main(['calibrate', '-k', '0', '-o', str(tmp_path / 'r.npz'),
+                  str(features)])
+
+
+def test_coverage(features, tmp_path):
+    output = tmp_path / 'coverage.json'
+    assert cli.main(['coverage', '-g', '8', '-o', str(output),
+                     str(features)]) == 0
+    with open(output) as f:
+        statistics = json.load(f)
+    counts = np.array(statistics[0]['counts'])
+    assert counts.shape == (6, 8)
+    assert counts.sum() == 8 * 54
@@ -0,0 +1,40 @@
+import numpy as np
+import toolboxClass.miscTools.detection_cache as detection_cache
+from toolboxClass.miscTools.detection_tools import CHESSBOARD, process_image
+
+
+def test_key_depends_on_the_content_and_the_settings():
+    key = detection_cache.get_key(b'image', CHESSBOARD, 6, 9)
+    assert key == detection_cache.get_key(b'image', CHESSBOARD, 6, 9)
+    assert key != detection_cache.get_key(b'other', CHESSBOARD, 6, 9)
+    assert key != detection_cache.get_key(b'image', CHESSBOARD, 9, 6)
+    assert key != detection_cache.get_key(b'image', CHESSBOARD, 6, 9,
+                                          (True,))
+
+
+def test_store_and_load(tmp_path):
+    folder = str(tmp_path)
+    features = np.random.RandomState(0).rand(54, 1, 2).astype(np.float32)
+    assert detection_cache.load(folder, 'ab01') == (False, None, None)
+    detection_cache.store(folder, 'ab01', features, 2)
+    found, cached, variant = detection_cache.load(folder, 'ab01')
+    assert found and variant == 2
+    np.testing.assert_array_equal(cached, features)
+    # images where the pattern was not found are cached too
+    detection_cache.store(folder, 'ab02', None, None)
+    assert detection_cache.load(folder, 'ab02') == (True, None, None)
+
+
+def test_cache_hit_gives_the_same_features(image_folder, tmp_path):
+    name = str(sorted(image_folder.iterdir())[0])
+    cache = str(tmp_path)
+    im, features, attempts = process_image(name, CHESSBOARD, 6, 9,
+                                           cache_folder=cache)
+    assert features is not None
+    assert all(seconds is not None for _, seconds, _ in attempts)
+    im_cached, cached, cached_attempts = process_image(name, CHESSBOARD, 6, 9,
+                                                       cache_folder=cache)
+    np.testing.assert_array_equal(im_cached, im)
+    np.testing.assert_array_equal(cached, features)
+    # the variant that found the features is read with them
+    assert cached_attempts == [(attempts[-1][0], None, True)]
@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+from toolboxClass.miscTools.detection_tools import CHESSBOARD, \
+    VariantStatistics, detect_features, get_pyramid, read_image
+
+
+def test_coarse_to_fine_detection_finds_the_same_corners(image_folder):
+    name = str(sorted(image_folder.iterdir())[0])
+    im = cv2.resize(read_image(name)[0], None, fx=4, fy=4,
+                    interpolation=cv2.INTER_CUBIC)
+    level, scale = get_pyramid(im)
+    assert scale > 1 and max(level.shape) * scale == max(im.shape)
+    full, _ = detect_features(im, CHESSBOARD, 6, 9)
+    coarse, _ = detect_features(im, CHESSBOARD, 6, 9, pyramid=True)
+    # the corners are refined in the full resolution image, they may differ
+    # slightly from the full resolution search
+    error = np.linalg.norm(coarse - full, axis=-1)
+    assert np.mean(error) < 0.3 and np.max(error) < 2
+
+
+def test_small_images_are_not_downscaled(image_folder):
+    name = str(sorted(image_folder.iterdir())[0])
+    assert get_pyramid(read_image(name)[0]) == (None, 1)
+
+
+def test_fixed_order_unless_adaptive():
+    stats = VariantStatistics(CHESSBOARD)
+    stats.add([(0, 0.1, False), (2, 0.1, True)])
+    assert stats.get_order() is None
+
+
+def test_adaptive_order_tries_the_most_successful_variant_first():
+    stats = VariantStatistics(CHESSBOARD, adaptive=True)
+    n = len(stats.hits)
+    assert stats.get_order() == list(range(n))
+    stats.add([(0, 0.1, False), (2, 0.1, True)])
+    stats.add([(0, 0.1, False), (2, 0.1, True)])
+    order = stats.get_order()
+    assert order[0] == 2 and sorted(order) == list(range(n))
+    assert stats.hits[2] == 2 and stats.attempts[0] == 2
+
+
+def test_cache_hits_update_the_adaptive_order():
+    stats = VariantStatistics(CHESSBOARD, adaptive=True)
+    stats.add([(1, None, True)])
+    stats.add([(None, None, False)])
+    assert stats.from_cache == 2
+    assert stats.get_order()[0] == 1
+    # the time and attempts are only the ones of the detections
+    assert sum(stats.attempts) == 0
@@ -0,0 +1,92 @@
+import numpy as np
+from toolboxClass.miscTools.heat_map import DensityAccumulator, \
+    get_circle_kernel, get_coverage
+
+
+def random_views(n, height=480, width=640, seed=0):
+    rng = np.random.RandomState(seed)
+    # some features outside the image, whose circles still reach it
+    return [(rng.rand(54, 1, 2) * [width + 80, height + 80] - 40)
+            .astype(np.float32) for _ in range(n)]
+
+
+def stamp(density, views):
+    """Function to sum the circle of each feature, one after the other."""
+    L = density.radius
+    n = 2 * L + 1
+    kernel = get_circle_kernel(L)
+    grid = np.zeros_like(density.grid)
+    for features in views:
+        for i, j in zip(*density._points(features)):
+            grid[i:i + n, j:j + n] += kernel
+    return grid
+
+
+def test_circle_kernel():
+    kernel = get_circle_kernel(5)
+    assert kernel.shape == (11, 11)
+    assert kernel[5, 5] == 5 and kernel[0, 0] == 0
+    # symmetric and decreasing from the center
+    np.testing.assert_array_equal(kernel, kernel.T)
+    np.testing.assert_array_equal(kernel, kernel[::-1])
+    assert np.all(np.diff(kernel[5, 5:]) <= 0)
+
+
+def test_density_is_the_sum_of_the_circles():
+    views = random_views(5)
+    density = DensityAccumulator(480, 640)
+    density.build(views)
+    np.testing.assert_array_equal(density.grid, stamp(density, views))
+    grid = density.get_grid()
+    assert grid.shape == (480, 640)
+    assert grid.min() == 0 and grid.max() == 1
+
+
+def test_incremental_density_equals_the_rebuilt_one():
+    views = random_views(10)
+    incremental = DensityAccumulator(480, 640, 160)
+    for features in views:
+        incremental.add(features)
+    for features in views[:4]:
+        incremental.remove(features)
+    rebuilt = DensityAccumulator(480, 640, 160)
+    rebuilt.build(views[4:] + [None])
+    np.testing.assert_array_equal(incremental.grid, rebuilt.grid)
+    np.testing.assert_array_equal(incremental.counts, rebuilt.counts)
+    np.testing.assert_array_equal(incremental.get_grid(), rebuilt.get_grid())
+
+
+def test_add_then_remove_gives_an_empty_density():
+    density = DensityAccumulator(480, 640)
+    views = random_views(3)
+    for features in views:
+        density.add(features)
+    for features in views:
+        density.remove(features)
+    assert not density.grid.any() and not density.counts.any()
+    np.testing.assert_array_equal(density.get_grid(), 0)
+
+
+def test_grid_width_scales_the_density():
+    density = DensityAccumulator(480, 640, 160)
+    assert (density.grid_height, density.grid_width) == (120, 160)
+    assert density.get_grid().shape == (120, 160)
+    assert DensityAccumulator(480, 640, 0).grid_width == 1
+
+
+def test_coverage():
+    # one feature in the center of each cell of a 4 x 3 grid, except one
+    features = np.array([[[80 + 160 * x, 80 + 160 * y]]
+                         for y in range(3) for x in range(4)][:-1],
+                        np.float32)
+    statistics = get_coverage([features], 480, 640, 4)
+    expected = np.ones((3, 4), int)
+    expected[2, 3] = 0
+    np.testing.assert_array_equal(statistics['counts'], expected)
+    assert statistics['cells_covered'] == 100.0 * 11 / 12
+    assert statistics['area_covered'] >= statistics['cells_covered']
+    # the same statistics as the accumulator updated view by view
+    density = DensityAccumulator(480, 640, 4)
+    density.add(features)
+    assert density.coverage()['area_covered'] == \
+        statistics['area_covered']
@@ -0,0 +1,43 @@
+import os
+import numpy as np
+from toolboxClass.miscTools.detection_tools import read_image
+from toolboxClass.miscTools.image_store import ImageStore, PREVIEW_SIZE
+
+
+def fill(store, image_folder):
+    names = sorted(str(p) for p in image_folder.iterdir())
+    images = []
+    for name in names:
+        images.append(read_image(name)[0])
+        store.append(images[-1], name)
+    return names, images
+
+
+def test_budget_keeps_the_recently_used_images(image_folder):
+    image_bytes = 480 * 640
+    store = ImageStore(budget=2 * image_bytes)
+    names, images = fill(store, image_folder)
+    assert store.get_resident_bytes() == 2 * image_bytes
+    # the dropped images are read again from their files
+    for i in range(len(names)):
+        np.testing.assert_array_equal(store[i], images[i])
+        assert store.get_resident_bytes() <= 2 * image_bytes
+    assert store.preview(0).shape == PREVIEW_SIZE[::-1]
+    del store[0]
+    assert len(store) == len(names) - 1
+
+
+def test_missing_file_falls_back_to_the_preview(image_folder, tmp_path):
+    name = str(sorted(image_folder.iterdir())[0])
+    copy = str(tmp_path / 'copy.png')
+    with open(name, 'rb') as f, open(copy, 'wb') as g:
+        g.write(f.read())
+    image = read_image(copy)[0]
+    store = ImageStore(budget=0)
+    store.append(image, copy)
+    store.append(image, name)
+    os.remove(copy)
+    fallback = store[0]
+    assert fallback.shape == image.shape
+    # the upscaled preview is close to the image
+    assert np.mean(np.abs(fallback.astype(float) - image)) < 20
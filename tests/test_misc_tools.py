@@ -0,0 +1,54 @@
+import itertools
+import numpy as np
+from toolboxClass.miscTools.misc_tools import CombinationSampler, \
+    RunningPercentile, get_indices_to_average, ncr, unrank_combination
+
+
+def draw_all(sampler):
+    samples = []
+    s = sampler.draw()
+    while s is not None:
+        samples.append(tuple(s))
+        s = sampler.draw()
+    return samples
+
+
+def test_unrank_combination_in_lexicographic_order():
+    combinations = list(itertools.combinations(range(7), 3))
+    assert [tuple(unrank_combination(rank, 7, 3))
+            for rank in range(ncr(7, 3))] == combinations
+
+
+def test_same_seed_gives_the_same_subsets():
+    def draw(seed):
+        sampler = CombinationSampler(20, 5, seed=seed)
+        return [sampler.draw() for _ in range(50)]
+    assert draw(3) == draw(3)
+    assert draw(3) != draw(4)
+
+
+def test_sampler_draws_every_combination_once():
+    samples = draw_all(CombinationSampler(8, 3, seed=0))
+    assert sorted(samples) == list(itertools.combinations(range(8), 3))
+
+
+def test_running_percentile_selects_as_get_indices_to_average():
+    rng = np.random.RandomState(0)
+    # ties are frequent with rounded values
+    values = list(np.round(rng.rand(200), 2)) + [0.5] * 10
+    percentile = RunningPercentile()
+    selected = set()
+    for i, value in enumerate(values):
+        entered, left = percentile.add(value)
+        selected |= set(entered)
+        selected -= set(left)
+        expected = get_indices_to_average(values[:i + 1])
+        assert sorted(selected) == percentile.get_selected() == expected
+        assert percentile.threshold == np.percentile(values[:i + 1], 75)
+
+
+def test_running_percentile_with_equal_values():
+    percentile = RunningPercentile()
+    for _ in range(3):
+        percentile.add(1.0)
+    assert percentile.get_selected() == [0, 1, 2]
@@ -0,0 +1,24 @@
+import operator
+from toolboxClass.miscTools.parallel_tools import ordered_map
+
+
+def test_ordered_map_keeps_the_order_of_the_tasks():
+    tasks = [(i, i) for i in range(20)]
+    expected = [i * i for i in range(20)]
+    assert list(ordered_map(operator.mul, tasks)) == expected
+    assert list(ordered_map(operator.mul, tasks, n_workers=3)) == expected
+
+
+def test_ordered_map_takes_the_tasks_lazily():
+    taken = []
+
+    def tasks():
+        for i in range(100):
+            taken.append(i)
+            yield i, 1
+
+    results = ordered_map(operator.mul, tasks(), n_workers=2, window=4)
+    assert next(results) == 0
+    results.close()
+    # only the tasks of the window were submitted
+    assert len(taken) <= 5
@@ -0,0 +1,26 @@
+from toolboxClass.miscTools.picture_cache import PictureCache
+
+
+def test_least_recently_used_pictures_are_dropped():
+    cache = PictureCache(budget=10)
+    cache.put((0, 'a', 0), 'a', 4)
+    cache.put((0, 'b', 0), 'b', 4)
+    assert cache.get((0, 'a', 0)) == 'a'
+    cache.put((0, 'c', 0), 'c', 4)
+    assert cache.get((0, 'b', 0)) is None
+    assert cache.get((0, 'a', 0)) == 'a' and len(cache) == 2
+    # the last picture is kept even over the budget
+    cache.put((0, 'd', 0), 'd', 20)
+    assert len(cache) == 1 and cache.get((0, 'd', 0)) == 'd'
+
+
+def test_discard_by_prefix():
+    cache = PictureCache()
+    for camera in range(2):
+        for tab in range(3):
+            cache.put((camera, 'a', tab), tab, 1)
+    cache.put((0, 'b', 0), 0, 1)
+    cache.discard((0, 'a'))
+    assert len(cache) == 4 and cache.get((0, 'b', 0)) == 0
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,127 @@
+import pytest
+
+pytest.importorskip('PIL')
+pytest.importorskip('matplotlib')
+from toolboxClass import _Plot  # noqa: E402
+from toolboxClass.miscTools.picture_cache import PictureCache  # noqa: E402
+
+N_TABS = 5
+
+
+class Picture:
+    def resize(self, size):
+        return self
+
+
+class Canvas:
+    def __init__(self):
+        self.image = None
+
+    def scale(self, *args):
+        pass
+
+    def coords(self, *args):
+        pass
+
+    def itemconfig(self, item, image):
+        self.image = image
+
+
+class Notebook:
+    def __init__(self):
+        self.tab = 0
+
+    def select(self):
+        return self.tab
+
+    def index(self, tab):
+        return tab
+
+
+class Variable:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class Widget:
+    def activate(self, index):
+        pass
+
+    def config(self, option):
+        return (option, 'raised')
+
+
+class Panels(_Plot.Mixin):
+    """Panels of the tabs of two cameras, counting the pictures drawn."""
+
+    def __init__(self):
+        self.n_cameras = 2
+        self.paths = [['a0', 'a1'], ['b0', 'b1']]
+        self.index = Variable(0)
+        self.index_corner = Variable(-1)
+        self.zoomhandler = 0
+        self.imscale = 1
+        self.scale = 1
+        self.listbox = Widget()
+        self.btn_move_feature = Widget()
+        self.list_panel = [[Canvas() for _ in range(N_TABS)]
+                           for _ in range(2)]
+        self.list_image_on_panel = [list(range(N_TABS)) for _ in range(2)]
+        self.tabControl = [Notebook(), Notebook()]
+        self.img = [[None] * N_TABS for _ in range(2)]
+        self.panel_dirty = [[True] * N_TABS for _ in range(2)]
+        self.picture_cache = PictureCache()
+        self.projection_version = 0
+        self.drawn = []
+
+    def tab_picture(self, camera, tab, selection):
+        self.drawn.append((camera, tab, selection))
+        return Picture()
+
+
+@pytest.fixture
+def panels(monkeypatch):
+    # PhotoImage needs a Tk interpreter
+    monkeypatch.setattr(_Plot.ImageTk, 'PhotoImage', lambda picture: picture)
+    return Panels()
+
+
+def test_only_the_shown_tabs_are_drawn(panels):
+    panels.tabControl[1].tab = 3
+    panels.updatePicture()
+    assert panels.drawn == [(0, 0, 0), (1, 3, 0)]
+    # the other tabs are drawn when they are shown, only once
+    panels.tabControl[0].tab = 1
+    panels.show_tab(0)
+    panels.show_tab(0)
+    assert panels.drawn[2:] == [(0, 1, 0)]
+
+
+def test_going_back_to_a_view_uses_the_cached_pictures(panels):
+    for selection in (0, 1, 0, 1):
+        panels.index.set(selection)
+        panels.updatePicture()
+    assert panels.drawn == [(0, 0, 0), (1, 0, 0), (0, 0, 1), (1, 0, 1)]
+    # a removed view is drawn again
+    panels.picture_cache.discard((0, 'a1'))
+    panels.updatePicture()
+    assert panels.drawn[4:] == [(0, 0, 1)]
+
+
+def test_key_of_the_original_ignores_the_corner_and_the_projections(panels):
+    key = panels.picture_key(0, 0, 0)
+    panels.index_corner.set(-2)
+    panels.projection_version += 1
+    assert panels.picture_key(0, 0, 0) == key
+    assert panels.picture_key(0, 1, 0) != panels.picture_key(0, 1, 1)
+    key = panels.picture_key(0, 3, 0)
+    panels.projection_version += 1
+    assert panels.picture_key(0, 3, 0) != key
+    # the heat map is not cached
+    assert panels.picture_key(0, 2, 0) is None
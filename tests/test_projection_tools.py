@@ -0,0 +1,80 @@
+import numpy as np
+from toolboxClass.miscTools.projection_tools import PoseCache, \
+    get_reprojection_errors, get_rms, get_stereo_transforms, project_views
+from tests.synthetic import CAMERA_MATRIX, DIST_COEFS, R_STEREO, T_STEREO
+
+
+def get_poses(cache, views, keys, camera_matrix=CAMERA_MATRIX):
+    objpoints, imgpoints = views
+    return cache.get_poses(0, keys, objpoints, imgpoints[0], camera_matrix,
+                           DIST_COEFS)
+
+
+def test_poses_are_reused_while_nothing_changes(views):
+    cache = PoseCache()
+    keys = ['view_%d' % i for i in range(len(views[0]))]
+    rvecs, tvecs = get_poses(cache, views, keys)
+    again = get_poses(cache, views, keys)
+    assert all(a is b for a, b in zip(rvecs, again[0]))
+    # other camera parameters refine the poses
+    camera_matrix = CAMERA_MATRIX * [[1.01], [1.01], [1]]
+    refined = get_poses(cache, views, keys, camera_matrix)
+    assert not any(a is b for a, b in zip(rvecs, refined[0]))
+    np.testing.assert_allclose(np.ravel(refined[0]), np.ravel(rvecs),
+                               atol=0.05)
+
+
+def test_poses_of_other_object_points_are_estimated_again(views):
+    cache = PoseCache()
+    keys = ['view_%d' % i for i in range(len(views[0]))]
+    _, tvecs = get_poses(cache, views, keys)
+    objpoints, imgpoints = views
+    # the same images of a pattern twice as big are twice as far
+    scaled = ([op * 2 for op in objpoints], imgpoints)
+    _, scaled_tvecs = get_poses(cache, scaled, keys)
+    np.testing.assert_allclose(np.ravel(scaled_tvecs), 2 * np.ravel(tvecs),
+                               rtol=1e-3)
+
+
+def test_remove_and_clear(views):
+    cache = PoseCache()
+    keys = ['view_%d' % i for i in range(len(views[0]))]
+    get_poses(cache, views, keys)
+    cache.remove(0, keys[0])
+    cache.remove(0, 'unknown')
+    assert keys[0] not in cache.poses[0] and len(cache.poses[0]) == 11
+    cache.clear()
+    assert cache.poses == [{}, {}]
+
+
+def test_reprojection_errors_as_a_loop_over_the_views():
+    rng = np.random.RandomState(0)
+    imgpoints = rng.rand(5, 54, 1, 2) * 640
+    projected = imgpoints + rng.normal(0, 0.5, imgpoints.shape)
+    rms, distances = get_reprojection_errors(list(imgpoints),
+                                             list(projected))
+    assert distances.shape == (5, 54, 1)
+    for i in range(5):
+        d = [np.linalg.norm(a - b) for a, b in zip(imgpoints[i],
+                                                    projected[i])]
+        np.testing.assert_allclose(distances[i].ravel(), d)
+        np.testing.assert_allclose(rms[i], np.sqrt(np.mean(np.square(d))))
+    np.testing.assert_allclose(get_rms(rms[:2], rms[2:]),
+                               np.sqrt(np.mean(np.square(rms))))
+
+
+def test_projections_of_the_other_camera(views):
+    objpoints, imgpoints = views
+    cache = PoseCache()
+    keys = list(range(len(objpoints)))
+    rvecs, tvecs = get_poses(cache, views, keys)
+    projected = project_views(objpoints, rvecs, tvecs, CAMERA_MATRIX,
+                              DIST_COEFS)
+    rms, _ = get_reprojection_errors(imgpoints[0], projected)
+    assert np.all(rms < 0.5)
+    # the poses of the first camera moved to the second one
+    transform = get_stereo_transforms(R_STEREO, T_STEREO)[0]
+    projected = project_views(objpoints, rvecs, tvecs, CAMERA_MATRIX,
+                              DIST_COEFS, transform)
+    rms, _ = get_reprojection_errors(imgpoints[1], projected)
+    assert np.all(rms < 0.5)
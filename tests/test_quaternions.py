@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+from toolboxClass.miscTools.quaternions import Rs_to_q, R_to_q, \
+    averageMatrix, averageQuaternions, q_to_R
+from toolboxClass.miscTools.statistics_tools import RunningQuaternionMean
+
+
+def random_rotations(n, seed=0, angle=np.pi):
+    rng = np.random.RandomState(seed)
+    axes = rng.normal(size=(n, 3))
+    axes /= np.linalg.norm(axes, axis=1)[:, np.newaxis]
+    angles = rng.uniform(0, angle, n)
+    return np.array([cv2.Rodrigues(a * t)[0] for a, t in zip(axes, angles)])
+
+
+def test_rotation_matrix_and_quaternion_round_trip():
+    R = random_rotations(50)
+    # rotations of 180 degrees are exact too
+    R = np.concatenate([R, [np.diag([1.0, -1.0, -1.0])]])
+    q = Rs_to_q(R)
+    np.testing.assert_allclose(np.linalg.norm(q, axis=1), 1)
+    assert np.all(q[:, 3] >= 0)
+    for R_i, q_i in zip(R, q):
+        np.testing.assert_allclose(q_to_R(q_i), R_i, atol=1e-12)
+        np.testing.assert_allclose(R_to_q(R_i), q_i)
+
+
+def test_average_of_close_rotations():
+    R = random_rotations(1)[0]
+    deltas = random_rotations(20, seed=1, angle=0.01)
+    R_mean = averageMatrix(np.array([d.dot(R) for d in deltas]))
+    np.testing.assert_allclose(R_mean, R, atol=0.01)
+
+
+def test_sign_of_the_quaternions_does_not_change_the_average():
+    q = Rs_to_q(random_rotations(10, angle=0.5))
+    signs = np.where(np.arange(10) % 2, -1.0, 1.0)[:, np.newaxis]
+    a = averageQuaternions(q)
+    b = averageQuaternions(q * signs)
+    np.testing.assert_allclose(np.abs(np.dot(a, b)), 1)
+
+
+def test_running_mean_as_averageQuaternions():
+    q = Rs_to_q(random_rotations(10, angle=0.5))
+    mean = RunningQuaternionMean()
+    for q_i in q:
+        mean.add(q_i)
+    mean.add(-q[0])
+    mean.remove(-q[0])
+    np.testing.assert_allclose(np.abs(np.dot(mean.mean(),
+                                             averageQuaternions(q))), 1)
+    for q_i in q:
+        mean.remove(q_i)
+    assert mean.mean() is None
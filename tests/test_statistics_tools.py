@@ -0,0 +1,32 @@
+import numpy as np
+from toolboxClass.miscTools.statistics_tools import RunningStatistics
+
+
+def test_running_statistics_as_numpy():
+    x = np.random.RandomState(0).rand(30, 4)
+    statistics = RunningStatistics()
+    for row in x:
+        statistics.add(row)
+    assert statistics.count == 30
+    np.testing.assert_allclose(statistics.mean, x.mean(axis=0))
+    np.testing.assert_allclose(statistics.std(), x.std(axis=0))
+    np.testing.assert_allclose(statistics.standard_error(),
+                               x.std(axis=0, ddof=1) / np.sqrt(30))
+
+
+def test_add_then_remove_gives_the_original_statistics():
+    x = np.random.RandomState(1).rand(20, 3)
+    statistics = RunningStatistics()
+    for row in x[:10]:
+        statistics.add(row)
+    mean, variance = statistics.mean, statistics.variance()
+    for row in x[10:]:
+        statistics.add(row)
+    for row in x[10:][::-1]:
+        statistics.remove(row)
+    assert statistics.count == 10
+    np.testing.assert_allclose(statistics.mean, mean)
+    np.testing.assert_allclose(statistics.variance(), variance)
+    for row in x[:10]:
+        statistics.remove(row)
+    assert statistics.count == 0
@@ -1,8 +1,13 @@
 import logging
+import tkinter as tk
 import cv2
 import numpy as np
-from toolboxClass.miscTools.misc_tools import ncr, get_all_combinations, get_one_combination, get_indices_to_average
-from toolboxClass.miscTools.quaternions import averageMatrix
+from toolboxClass.miscTools.background_tools import BackgroundJob
+from toolboxClass.miscTools.misc_tools import ncr
+from toolboxClass.miscTools.projection_tools import get_stereo_transforms, project_views, \
+    get_reprojection_errors, get_rms
+from toolboxClass.miscTools.calibration_tools import ClusterCalibration, get_calibration_flags, \
+    calibrate_with_uncertainty
 from toolboxClass.miscTools.time_tools import chronometer
 
 logging.basicConfig(level=logging.ERROR)
@@ -40,11 +45,9 @@ class Mixin:
                 if j == 0:
                     self.objpoints.append(self.object_pattern)
 
-        flags_parameters = \
-            int(self.p_intrinsics_guess.get())*cv2.CALIB_USE_INTRINSIC_GUESS +\
-            int(self.p_fix_point.get()) * cv2.CALIB_FIX_PRINCIPAL_POINT + \
-            int(self.p_fix_ratio.get()) * cv2.CALIB_FIX_ASPECT_RATIO + \
-            int(self.p_zero_tangent_distance.get())*cv2.CALIB_ZERO_TANGENT_DIST
+        flags_parameters = get_calibration_flags(
+            self.p_intrinsics_guess.get(), self.p_fix_point.get(),
+            self.p_fix_ratio.get(), self.p_zero_tangent_distance.get())
 
         logging.debug('%s', self.how_to_calibrate.get())
         if self._(u'Clustering') in self.how_to_calibrate.get():
@@ -81,6 +84,24 @@ class Mixin:
                 self.label_msg[0].configure(
                     text=self._('K parameter can not be empty'))
                 b_continue = False
+            try:
+                seed = self.c_seed.get()
+            except (ValueError, tk.TclError):
+                self.label_msg[1].configure(
+                    text=self._('Seed can not be empty'))
+                b_continue = False
+            # with early stopping, k is the maximum number of groups
+            tolerances = None
+            time_budget = None
+            if self.c_adaptive.get():
+                try:
+                    tolerances = (self.c_tol_px.get(), self.c_tol_dist.get(),
+                                  self.c_tol_T.get())
+                    time_budget = self.c_time_budget.get() or None
+                except (ValueError, tk.TclError):
+                    self.label_msg[0].configure(
+                        text=self._('Tolerances can not be empty'))
+                    b_continue = False
             if not b_continue:
                 self.btn_play.config(relief='raised')
                 self.btn_play.config(state='normal')
@@ -98,212 +119,52 @@ class Mixin:
                           + self._('%d to %d (maximum possible)') % (c_k, k)))
                 self.popup.update()  # for updating while running other process
 
+            calibration = ClusterCalibration(self.objpoints,
+                                             self.imgpoints[:self.n_cameras],
+                                             self.size[:self.n_cameras],
+                                             flags_parameters, k, c_r,
+                                             self.m_stereo,
+                                             self.get_number_of_workers(),
+                                             seed=seed,
+                                             warm_start=self.p_warm_start.get(),
+                                             tolerances=tolerances,
+                                             time_budget=time_budget,
+                                             two_stage=self.p_two_stage.get(),
+                                             keep_subsets=self.p_keep_subsets.get())
+            # the calibration runs in a background thread, the calibrate
+            # button cancels it meanwhile
+            calib_button.config(state='normal', text=self._(u'Cancel'),
+                                command=self.cancel_calibration)
             time_play = chronometer()
-
-            C_array = []
-            D_array = []
-            self.R_array = []
-            self.T_array = []
-
-            self.fx_array = [[], []]
-            self.fy_array = [[], []]
-            self.cx_array = [[], []]
-            self.cy_array = [[], []]
-            self.k1_array = [[], []]
-            self.k2_array = [[], []]
-            self.k3_array = [[], []]
-            self.k4_array = [[], []]
-            self.k5_array = [[], []]
-            self.RMS_array = []
-
-            if k == max_k:
-                self.samples = get_all_combinations(self.n_total.get(), c_r)
-            else:
-                self.samples = []
-
-            indices_to_average = None
-            counter = 0
-            doCalibration = True
-            while doCalibration:  # for counter in range(k):
-                # if k is the maximum possible, read list
-                if k != max_k:
-                    getting_new_sample = True
-                    while getting_new_sample:
-                        s = get_one_combination(self.n_total.get(), c_r)
-                        if s not in self.samples:
-                            self.samples.append(s)
-                            getting_new_sample = False
-                else:
-                    s = self.samples[counter]
-
-                # select the object points of the sample
-                op = list(self.objpoints[i] for i in s)
-                ip, c, d = [], [], []
-                for j in range(self.n_cameras):
-                    # select the object points of the sample for each camera
-                    ip.append(list(self.imgpoints[j][i] for i in s))
-                    c.append(np.eye(3, dtype=np.float32))
-                    d.append(np.zeros((5, 1), dtype=np.float32))
-
-                R = None
-                T = None
-
-                if self.m_stereo:
-                    # move coordinates when images size are different
-                    if self.size[0] != self.size[1]:
-                        logging.debug(self._('Different camera resolution'))
-                        ip = np.array(ip)
-                        index_min = self.size.index(min(self.size))
-                        index_max = self.size.index(max(self.size))
-                        w_max, h_max = self.size[index_max]
-                        w_min, h_min = self.size[index_min]
-                        w_adj = (w_max - w_min) / 2
-                        h_adj = (h_max - h_min) / 2
-                        n_poses, n_points, _, _ = ip[index_min].shape
-                        logging.debug(
-                            self._('Transforming coordinates for camera %s'),
-                            index_min + 1)
-                        for pose in range(n_poses):
-                            for point in range(n_points):
-                                ip[index_min][pose][point] = \
-                                    np.sum([ip[index_min][pose][point],
-                                            [[h_adj, w_adj]]],
-                                           axis=0)
-                    width = max(self.size[0][1], self.size[1][1])
-                    height = max(self.size[0][0], self.size[1][0])
-                    rms, c[0], d[0], c[1], d[1], R, T, _, _ = \
-                        cv2.stereoCalibrate(op, ip[0], ip[1], c[0], d[0], c[1],
-                                            d[1], (width, height),
-                                            flags=flags_parameters)
-                else:
-                    width = self.size[0][1]
-                    height = self.size[0][0]
-                    rms, c[0], d[0], _, _ = \
-                        cv2.calibrateCamera(op, ip[0], (width, height),
-                                            c[0], d[0], flags=flags_parameters)
-
-                logging.info(self._('this is stereo rms error: %s'), rms)
-                # add to matrices
-                C_array.append(c)
-                D_array.append(d)
-                self.RMS_array.append(rms)
-                if self.m_stereo:
-                    self.R_array.append(R)
-                    self.T_array.append(T)
-                indices_to_average = get_indices_to_average(self.RMS_array)
-                # include sample  results for calibrations
-                counter = len(indices_to_average)
-
-                # percentage of completion of process
-                c_percent = (counter+1) / k
-                self.progbar['value'] = c_percent * 10.0
-                elapsed_time_1 = time_play.gettime()
-                t_left_minutes, t_left_seconds = divmod(elapsed_time_1 * (1 / c_percent - 1), 60)
-                if t_left_minutes != 0:
-                    self.lb_time.config(text=self._('Estimated time left: %d minutes and %d seconds') % (
-                        max(t_left_minutes, 0), max(t_left_seconds, 0)))
-                else:
-                    self.lb_time.config(text=self._('Estimated time left: %d seconds') % (max(t_left_seconds, 0)))
-                # update label
-                self.style_pg.configure('text.Horizontal.TProgressbar',
-                                        text='{:g} %'
-                                        .format(int(c_percent * 100)))
-                # checks if desired number of calibrations is reached
-                if counter >= k:
-                    break
-                self.popup.update()  # updating while running other process
-
-            self.label_status[1][1].config(text=u'\u2714')
-            self.label_status[1][2].config(text='%0.5f' % elapsed_time_1)
-            self.lb_time.config(text='')
-
-            logging.info(self._('selected calibrations: %s'), len(indices_to_average))
-            logging.info(self._('total calibrations: %s'), len(self.samples))
-            #self.exportCalibrationParametersIteration()
-            # get camera and distortion array according to indices to average
-            C_array = np.array(C_array)[indices_to_average]
-            D_array = np.array(D_array)[indices_to_average]
-            # extract array of parameters of camera an distortion array
-            for j in range(self.n_cameras):
-                self.fx_array[j] = C_array[:,j][:, 0][:, 0]
-                self.fy_array[j] = C_array[:,j][:, 1][:, 1]
-                self.cx_array[j] = C_array[:,j][:, 0][:, 2]
-                self.cy_array[j] = C_array[:,j][:, 1][:, 2]
-                self.k1_array[j] = D_array[:,j][:, 0][:, 0]
-                self.k2_array[j] = D_array[:,j][:, 1][:, 0]
-                self.k3_array[j] = D_array[:,j][:, 2][:, 0]
-                self.k4_array[j] = D_array[:,j][:, 3][:, 0]
-                self.k5_array[j] = D_array[:,j][:, 4][:, 0]
-            # get rotation and traslation array according to indices to average
-            if self.m_stereo:
-                self.R_array = np.array(self.R_array)[indices_to_average]
-                self.T_array = np.array(self.T_array)[indices_to_average]
-            # get rms array according to indices to average
-            self.RMS_array = np.array(self.RMS_array)[indices_to_average]
-            # get samples array according to indices to average
-            self.samples = np.array(self.samples)[indices_to_average]
-
-            # calculate parameters
-            if len(C_array) > 0:
-                self.camera_matrix = np.mean(C_array, axis=0)
-                self.dist_coefs = np.mean(D_array, axis=0)
-                self.dev_camera_matrix = np.std(C_array, axis=0)
-                self.dev_dist_coefs = np.std(D_array, axis=0)
-                if self.m_stereo:
-                    self.R_stereo = averageMatrix(self.R_array)
-                    self.T_stereo = np.mean(np.array(self.T_array), axis=0)
-                    # Correction for cx and cy parameters
-                    if self.size[0] != self.size[1]:
-                        logging.debug(self
-                                      ._('Correcting cx an cy for camera {0}')
-                                      .format(index_min + 1))
-                        self.camera_matrix[index_min][0][2] -= h_adj
-                        self.camera_matrix[index_min][1][2] -= w_adj
-            else:
-                self.reset_camera_parameters()
-
-            elapsed_time_2 = time_play.gettime()
-            self.label_status[2][1].config(text=u'\u2714')
-            self.label_status[2][2].config(text='%0.5f' %
-                                           (elapsed_time_2
-                                            - elapsed_time_1))
-
-            if np.any(self.camera_matrix[:, 0, 0] == 1):
-                self.reset_camera_parameters()
-                self.reset_error()
-            else:
-                logging.debug(self._('Correct!'))
-                # Camera projections
-                self.calculate_projection()
-                elapsed_time_3 = time_play.gettime()
-                self.label_status[3][1].config(text=u'\u2714')
-                self.label_status[3][2].config(text='%0.5f' %
-                                               (elapsed_time_3
-                                                - elapsed_time_2))
-                # Calculate RMS error
-                self.calculate_error()
-
-                elapsed_time_4 = time_play.gettime()
-                self.label_status[4][1].config(text=u'\u2714')
-                self.label_status[4][2].config(text='%0.5f' %
-                                               (elapsed_time_4
-                                                - elapsed_time_3))
-                self.label_status[5][2].config(text='%0.5f' % elapsed_time_4)
-                # enable export parameters buttons
-                self.btn_export.config(state='normal')
-                self.btn_export2.config(state='normal')
-                for e in self.rms:
-                    if e == float('inf') or e == float('-inf'):
-                        logging.warning(self._('Error is too high'))
-                        # mark X for step 3 and 4
-                        self.label_status[4][1].config(text=u'\u2718')
-                        self.label_status[4][1].config(text=u'\u2718')
-                        self.reset_camera_parameters()
-                        self.reset_error()
-                        # disable export parameters button
-                        self.btn_export.config(state='disable')
-                        self.btn_export2.config(state='disable')
-                        break
+            views = self.get_views()
+            self.calibration_job = BackgroundJob(
+                self.master,
+                lambda post, cancelled: self.run_clustering(
+                    calibration, time_play, post, cancelled),
+                lambda events: self.show_clustering_events(events, k,
+                                                           time_play),
+                lambda result, error: self.finish_clustering(
+                    calib_button, result, views, k, time_play)).start()
+            return
+
+        elif self._(u'Fast') in self.how_to_calibrate.get():
+            # one calibration with all the images in a background thread,
+            # the calibrate button cancels it meanwhile
+            for j in range(1, 5):
+                self.label_status_f[j][1].config(text='')
+                self.label_status_f[j][2].config(text='')
+            calib_button.config(state='normal', text=self._(u'Cancel'),
+                                command=self.cancel_calibration)
+            time_play = chronometer()
+            views = self.get_views()
+            self.calibration_job = BackgroundJob(
+                self.master,
+                lambda post, cancelled: self.run_fast_uncertainty(
+                    flags_parameters, time_play, post, cancelled),
+                self.show_fast_uncertainty_events,
+                lambda result, error: self.finish_fast_uncertainty(
+                    calib_button, result, views, time_play)).start()
+            return
 
         elif self._(u'Load') in self.how_to_calibrate.get():
             b_continue = True
@@ -389,88 +250,371 @@ class Mixin:
                     else:
                         self.label_status_l[4][1].config(text=u'\u2714')
 
+        self.finish_play(calib_button)
+
+    def finish_play(self, calib_button):
+        """Function to show the calibration results and enable again the calibrate button."""
         self.update = True  # Update bool activated
 
         self.updateCameraParametersGUI()
         self.loadBarError([0, 1])
-        calib_button.config(state='normal')
+        if calib_button.winfo_exists():
+            calib_button.config(state='normal', text=self._(u'Calibrate'),
+                                command=lambda: self.play(calib_button))
         self.btn_play.config(relief='raised')
         self.btn_play.config(state='normal')
 
+    def cancel_calibration(self):
+        """Function to stop the background calibration, the previous parameters are kept."""
+        if self.calibration_job is not None:
+            self.calibration_job.cancel()
+
+    def exit_play_popup(self):
+        """Function to close the calibration popup, cancelling the calibration if it is running."""
+        self.cancel_calibration()
+        self.popup.destroy()
+
+    def get_views(self):
+        """Function to get the files of the views of each camera, to check that they did not change while calibrating."""
+        return [list(self.paths[j]) for j in range(self.n_cameras)]
+
+    def run_clustering(self, calibration, time_play, post, cancelled):
+        """Function running in the background thread, it calibrates the subsets and averages their parameters.
+
+        The session data is not changed here, the progress, the averaged
+        parameters so far and the finished steps are posted as
+        ('progress', counter), ('estimate', ...) and ('step', step, time)
+        events for the GUI. Returns the calibration, None if it was
+        cancelled.
+        """
+        def progress(counter):
+            post(('progress', counter))
+            # averaged parameters of the subsets selected so far
+            estimate = calibration.get_estimate()
+            if estimate is not None:
+                post(('estimate',) + estimate)
+        calibration.calibrate(progress=progress, cancelled=cancelled)
+        if cancelled.is_set():
+            return None
+        elapsed_time_1 = time_play.gettime()
+        post(('step', 1, elapsed_time_1))
+        if calibration.warm_start:
+            post(('warm start', calibration.time_warm_start,
+                  calibration.time_subsets, calibration.n_calibrated))
+        post(('stop', calibration.stop_reason, calibration.n_calibrated))
+
+        calibration.average()
+        if cancelled.is_set():
+            return None
+        elapsed_time_2 = time_play.gettime()
+        post(('step', 2, elapsed_time_2 - elapsed_time_1))
+        return calibration
+
+    def set_clustering_results(self, calibration, time_play, post):
+        """Function to set the results of the calibration in the session and calculate projections and errors.
+
+        It runs in the Tk main loop when the background calibration ends,
+        the finished steps are given to post as ('step', step, time).
+        Returns True if all the steps finished.
+        """
+        elapsed_time_2 = time_play.gettime()
+        self.fx_array = calibration.fx_array
+        self.fy_array = calibration.fy_array
+        self.cx_array = calibration.cx_array
+        self.cy_array = calibration.cy_array
+        self.k1_array = calibration.k1_array
+        self.k2_array = calibration.k2_array
+        self.k3_array = calibration.k3_array
+        self.k4_array = calibration.k4_array
+        self.k5_array = calibration.k5_array
+        self.R_array = calibration.R_array
+        self.T_array = calibration.T_array
+        self.RMS_array = calibration.RMS_array
+        self.samples = calibration.samples
+
+        # calculate parameters
+        if calibration.camera_matrix is not None:
+            self.camera_matrix = calibration.camera_matrix
+            self.dist_coefs = calibration.dist_coefs
+            self.dev_camera_matrix = calibration.dev_camera_matrix
+            self.dev_dist_coefs = calibration.dev_dist_coefs
+            if self.m_stereo:
+                self.R_stereo = calibration.R_stereo
+                self.T_stereo = calibration.T_stereo
+        else:
+            self.reset_camera_parameters()
+
+        if calibration.camera_matrix is None \
+                or np.any(self.camera_matrix[:, 0, 0] == 1):
+            self.reset_camera_parameters()
+            self.reset_error()
+            return False
+        logging.debug(self._('Correct!'))
+        # Camera projections
+        self.calculate_projection()
+        elapsed_time_3 = time_play.gettime()
+        post(('step', 3, elapsed_time_3 - elapsed_time_2))
+        # Calculate RMS error
+        self.calculate_error()
+        elapsed_time_4 = time_play.gettime()
+        post(('step', 4, elapsed_time_4 - elapsed_time_3))
+        post(('step', 5, elapsed_time_4))
+        for e in self.rms:
+            if e == float('inf') or e == float('-inf'):
+                logging.warning(self._('Error is too high'))
+                self.reset_camera_parameters()
+                self.reset_error()
+                return False
+        return True
+
+    def show_clustering_events(self, events, k, time_play):
+        """Function to show the progress of the background calibration."""
+        if not self.progbar.winfo_exists():
+            return
+        progress = [e for e in events if e[0] == 'progress']
+        # only the last progress is shown, the polling of the events already
+        # limits how often the GUI is updated
+        if progress:
+            self.update_clustering_progress(progress[-1][1], k, time_play)
+        estimates = [e for e in events if e[0] == 'estimate']
+        if estimates:
+            # live estimates, the labels are set again from the results when
+            # the calibration ends or is cancelled
+            self.updateParametersLabels(self.n_cameras,
+                                        int(self.m_stereo) * 3,
+                                        *estimates[-1][1:])
+        for event in events:
+            if event[0] == 'warm start':
+                # time of the calibration with all images and of the subsets
+                _, time_warm_start, time_subsets, n_subsets = event
+                self.lb_time.config(text=self._('Warm start: %0.2f s, %d subsets: %0.2f s') % (time_warm_start, n_subsets, time_subsets))
+            elif event[0] == 'stop':
+                # show why the calibration stopped before k groups
+                _, reason, n_subsets = event
+                text = self.lb_time.cget('text') if self.p_warm_start.get() \
+                    else ''
+                if reason == 'converged':
+                    text += self._('\nConverged after %d calibrations') % n_subsets
+                elif reason == 'time budget':
+                    text += self._('\nTime budget reached after %d calibrations') % n_subsets
+                self.lb_time.config(text=text.strip())
+            elif event[0] == 'step':
+                _, step, elapsed_time = event
+                if step < 5:
+                    self.label_status[step][1].config(text=u'\u2714')
+                self.label_status[step][2].config(text='%0.5f' % elapsed_time)
+                if step == 4:
+                    self.progbar['value'] = 10.0
+                    self.style_pg.configure('text.Horizontal.TProgressbar',
+                                            text='100 %')
+
+    def finish_clustering(self, calib_button, calibration, views, k,
+                          time_play):
+        """Function to set the results and update the GUI when the background calibration ends."""
+        self.calibration_job = None
+        result = False
+        if calibration is not None:
+            # the results are only valid for the views they were calibrated
+            # with
+            if self.get_views() != views:
+                logging.warning(self._('Images changed during the calibration'))
+            else:
+                events = []
+                result = self.set_clustering_results(calibration, time_play,
+                                                     events.append)
+                self.show_clustering_events(events, k, time_play)
+        if result:
+            # enable export parameters buttons, the results of each subset
+            # only if they were kept
+            self.btn_export.config(state='normal')
+            self.btn_export2.config(
+                state='normal' if len(self.samples) else 'disable')
+        else:
+            # disable export parameters buttons
+            self.btn_export.config(state='disable')
+            self.btn_export2.config(state='disable')
+            if calib_button.winfo_exists():
+                self.lb_time.config(text='')
+                # mark X for the first step not finished, or for the error
+                # if it is too high
+                for step in range(1, 5):
+                    if not self.label_status[step][1].cget('text'):
+                        self.label_status[step][1].config(text=u'\u2718')
+                        break
+                else:
+                    self.label_status[4][1].config(text=u'\u2718')
+        self.finish_play(calib_button)
+
+    def run_fast_uncertainty(self, flags, time_play, post, cancelled):
+        """Function running in the background thread, it calibrates all the images once.
+
+        The standard deviations of the parameters are the ones estimated by
+        OpenCV instead of the ones of k groups. The session data is not
+        changed here, the finished step is posted as ('step', step, time)
+        for the GUI. Returns (rms, c, d, dev_c, dev_d, R, T, rvecs, tvecs),
+        None if it was cancelled.
+        """
+        results = calibrate_with_uncertainty(self.objpoints,
+                                             self.imgpoints[:self.n_cameras],
+                                             self.size[:self.n_cameras],
+                                             flags, self.m_stereo)
+        if cancelled.is_set():
+            return None
+        post(('step', 1, time_play.gettime()))
+        return results[:-1]
+
+    def set_fast_uncertainty_results(self, results, time_play, post):
+        """Function to set the results of the fast uncertainty calibration in the session and calculate projections and errors.
+
+        It runs in the Tk main loop when the background calibration ends,
+        the finished steps are given to post as ('step', step, time).
+        Returns True if all the steps finished.
+        """
+        rms, c, d, dev_c, dev_d, R, T, rvecs, tvecs = results
+        elapsed_time_1 = time_play.gettime()
+        if not np.isfinite(rms) or np.any(np.array(c)[:, 0, 0] == 1):
+            self.reset_camera_parameters()
+            self.reset_error()
+            return False
+        self.camera_matrix = np.array(c)
+        self.dist_coefs = np.array(d)
+        self.dev_camera_matrix = np.array(dev_c)
+        self.dev_dist_coefs = np.array(dev_d)
+        if self.m_stereo:
+            self.R_stereo = R
+            self.T_stereo = T
+        # results per calibration, there is only the one with all images
+        self.fx_array = [[c_j[0][0]] for c_j in c]
+        self.fy_array = [[c_j[1][1]] for c_j in c]
+        self.cx_array = [[c_j[0][2]] for c_j in c]
+        self.cy_array = [[c_j[1][2]] for c_j in c]
+        self.k1_array = [[d_j[0][0]] for d_j in d]
+        self.k2_array = [[d_j[1][0]] for d_j in d]
+        self.k3_array = [[d_j[2][0]] for d_j in d]
+        self.k4_array = [[d_j[3][0]] for d_j in d]
+        self.k5_array = [[d_j[4][0]] for d_j in d]
+        self.R_array = [R]
+        self.T_array = [T]
+        self.RMS_array = [rms]
+        self.samples = [list(range(len(self.objpoints)))]
+        # the poses of the calibration are used for the projections
+        for j in range(self.n_cameras):
+            self.pose_cache.set(j, self.paths[j], self.objpoints,
+                                self.imgpoints[j], rvecs[j], tvecs[j], c[j],
+                                d[j])
+
+        # Camera projections
+        self.calculate_projection()
+        elapsed_time_2 = time_play.gettime()
+        post(('step', 2, elapsed_time_2 - elapsed_time_1))
+        # Calculate RMS error
+        self.calculate_error()
+        elapsed_time_3 = time_play.gettime()
+        post(('step', 3, elapsed_time_3 - elapsed_time_2))
+        post(('step', 4, elapsed_time_3))
+        for e in self.rms:
+            if e == float('inf') or e == float('-inf'):
+                logging.warning(self._('Error is too high'))
+                self.reset_camera_parameters()
+                self.reset_error()
+                return False
+        return True
+
+    def show_fast_uncertainty_events(self, events):
+        """Function to show the finished steps of the fast uncertainty calibration."""
+        if not self.label_status_f[0][0].winfo_exists():
+            return
+        for _, step, elapsed_time in events:
+            if step < 4:
+                self.label_status_f[step][1].config(text=u'\u2714')
+            self.label_status_f[step][2].config(text='%0.5f' % elapsed_time)
+
+    def finish_fast_uncertainty(self, calib_button, results, views,
+                                time_play):
+        """Function to set the results and update the GUI when the fast uncertainty calibration ends."""
+        self.calibration_job = None
+        result = False
+        if results is not None:
+            # the results are only valid for the views they were calibrated
+            # with
+            if self.get_views() != views:
+                logging.warning(self._('Images changed during the calibration'))
+            else:
+                events = []
+                result = self.set_fast_uncertainty_results(results, time_play,
+                                                           events.append)
+                self.show_fast_uncertainty_events(events)
+        state = 'normal' if result else 'disable'
+        # enable or disable export parameters buttons
+        self.btn_export.config(state=state)
+        self.btn_export2.config(state=state)
+        if not result and calib_button.winfo_exists():
+            # mark X for the first step not finished, or for the error if it
+            # is too high
+            for step in range(1, 4):
+                if not self.label_status_f[step][1].cget('text'):
+                    self.label_status_f[step][1].config(text=u'\u2718')
+                    break
+            else:
+                self.label_status_f[3][1].config(text=u'\u2718')
+        self.finish_play(calib_button)
+
+    def update_clustering_progress(self, counter, k, time_play):
+        """Function to update progress bar and estimated time left after each subset calibration."""
+        # percentage of completion of process
+        c_percent = (counter+1) / k
+        self.progbar['value'] = c_percent * 10.0
+        elapsed_time_1 = time_play.gettime()
+        t_left_minutes, t_left_seconds = divmod(elapsed_time_1 * (1 / c_percent - 1), 60)
+        if t_left_minutes != 0:
+            self.lb_time.config(text=self._('Estimated time left: %d minutes and %d seconds') % (
+                max(t_left_minutes, 0), max(t_left_seconds, 0)))
+        else:
+            self.lb_time.config(text=self._('Estimated time left: %d seconds') % (max(t_left_seconds, 0)))
+        # update label
+        self.style_pg.configure('text.Horizontal.TProgressbar',
+                                text='{:g} %'
+                                .format(int(c_percent * 100)))
+
     def calculate_projection(self, r=None, t=None):
-        if t is None:
-            t = []
-        if r is None:
-            r = []
+        """Function to project the pattern of each view with the camera parameters and, for stereo, into the other camera.
+
+        The poses of the views come from r and t if given, otherwise from
+        the pose cache, which refines them with cv2.solvePnP when the
+        parameters changed.
+        """
         op = self.objpoints
         ip = self.imgpoints
         c = self.camera_matrix
         d = self.dist_coefs
+        if self.m_stereo:
+            transforms = get_stereo_transforms(self.R_stereo, self.T_stereo)
 
         for j in range(self.n_cameras):
-            self.projected[j] = []
-            self.projected_stereo[(j + 1) % 2] = []
-            for i, _ in enumerate(op):
-                if not r:
-                    _, r1, t1, _ = cv2.solvePnPRansac(op[i],
-                                                      ip[j][i],
-                                                      c[j],
-                                                      d[j])
-                else:
-                    r1 = r[i][:]
-                    t1 = t[i][:]
-
-                imgpoints2, _ = cv2.projectPoints(op[i], r1, t1, c[j], d[j])
-                self.projected[j].append(imgpoints2)
-
-                if self.m_stereo:
-                    r1 = cv2.Rodrigues(r1)[0]
-
-                    if j == 1:
-                        r2 = np.dot(np.linalg.inv(self.R_stereo), r1)
-                        t2 = np.dot(np.linalg.inv(self.R_stereo), t1) \
-                            - np.dot(np.linalg.inv(self.R_stereo),
-                                     self.T_stereo)
-                    else:
-                        r2 = np.dot(self.R_stereo, r1)
-                        t2 = np.dot(self.R_stereo, t1) + self.T_stereo
-
-                    imgpoints2, _ = cv2.projectPoints(op[i], r2, t2,
-                                                      c[(j + 1) % 2],
-                                                      d[(j + 1) % 2])
-                    self.projected_stereo[(j + 1) % 2].append(imgpoints2)
+            if not r:
+                r_j, t_j = self.pose_cache.get_poses(j, self.paths[j], op,
+                                                     ip[j], c[j], d[j])
+            else:
+                r_j, t_j = r, t
+            self.projected[j] = project_views(op, r_j, t_j, c[j], d[j])
+            if self.m_stereo:
+                self.projected_stereo[(j + 1) % 2] = project_views(
+                    op, r_j, t_j, c[(j + 1) % 2], d[(j + 1) % 2],
+                    transforms[j])
+        # the pictures of the projections are drawn again
+        self.projection_version += 1
 
     def calculate_error(self):
+        """Function to calculate the reprojection errors of all the views, as arrays for each camera."""
         for j in range(self.n_cameras):
-            ip = self.imgpoints[j]
-            self.r_error_p[j] = []
-            self.r_error[j] = []
-            for i, _ in enumerate(ip):
-                if self.m_stereo:
-                    imgpoints2 = self.projected_stereo[j][i]
-                else:
-                    imgpoints2 = self.projected[j][i]
-                self.r_error[j].append(np.sqrt((
-                        np.power(np.linalg.norm(ip[i] - imgpoints2, axis=2), 2)
-                        .mean())))
-                self.r_error_p[j].append(np.linalg.norm(ip[i] - imgpoints2,
-                                                        axis=2))
-                # Calculated value to update progressbar
-                c_percent = (j * len(ip) + i + 1) \
-                    / float(self.n_cameras * len(ip))
-                self.progbar['value'] = c_percent * 10.0
-                # update label
-                self.style_pg.configure('text.Horizontal.TProgressbar',
-                                        text='{:g} %'
-                                        .format(int(c_percent * 100)))
-                self.popup.update()  # for updating while running other process
-                # update rms when the error for all the images is calculated
-                if len(self.r_error[j]) == len(ip):
-                    logging.info(self._('Updating RMS for camera %d'), j + 1)
-                    self.rms[j] = np.sqrt(np.sum(np.square(self.r_error[j])) /
-                                          len(self.r_error[j]))
-                    if j == 1:
-                        self.rms[2] = np.sqrt(
-                            np.sum(np.square(self.r_error[0]
-                                             + self.r_error[1]))
-                            / len(self.r_error[0] + self.r_error[1]))
+            if self.m_stereo:
+                projected = self.projected_stereo[j]
+            else:
+                projected = self.projected[j]
+            self.r_error[j], self.r_error_p[j] = get_reprojection_errors(
+                self.imgpoints[j], projected)
+            # update rms when the error for all the images is calculated
+            logging.info(self._('Updating RMS for camera %d'), j + 1)
+            self.rms[j] = get_rms(self.r_error[j])
+            if j == 1:
+                self.rms[2] = get_rms(self.r_error[0], self.r_error[1])
@@ -10,10 +10,12 @@ class Mixin:
         # array of rms error for each pose
         self.r_error = [None, None]
         # array of pixel distance error for each feature
-        self.r_error_p = [[], []]
+        self.r_error_p = [None, None]
         # projections
         self.projected = [[], []]
         self.projected_stereo = [[], []]
+        # the pictures of the projections are drawn again
+        self.projection_version += 1
 
     def reset_camera_parameters(self):
         """Function to reset all intrinsics and extrinsics parameters."""
@@ -51,6 +53,7 @@ class Mixin:
             # delete for each selected image the path, original image,
             # features, projections, and erros from the corresponding list
             for j in range(self.n_cameras):
+                self.remove_view_features(j, index[0])
                 del self.paths[j][index[0]]
                 del self.img_original[j][index[0]]
                 del self.detected_features[j][index[0]]
@@ -62,9 +65,14 @@ class Mixin:
                         del self.projected_stereo[0][index[0]]
                         del self.projected_stereo[1][index[0]]
                 # barchar
-                if self.r_error[j]:  # check if reprojection error data exists
-                    del self.r_error[j][index[0]]
-                    del self.r_error_p[j][index[0]]
+                # check if reprojection error data exists
+                if self.r_error[j] is not None:
+                    self.r_error[j] = np.delete(self.r_error[j], index[0])
+                    self.r_error_p[j] = np.delete(self.r_error_p[j],
+                                                  index[0], axis=0)
+                    if len(self.r_error[j]) == 0:
+                        self.r_error[j] = None
+                        self.r_error_p[j] = None
             # update number of total poses
             self.n_total.set(self.n_total.get() - 1)
             # check if there is already a selected image in data browser
@@ -6,6 +6,12 @@ import numpy as np
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import toolboxClass.miscTools.hint_label as hl
+from toolboxClass.miscTools.detection_cache import get_default_cache_folder
+from toolboxClass.miscTools.detection_tools import get_object_pattern
+from toolboxClass.miscTools.image_store import ImageStore, DEFAULT_BUDGET
+from toolboxClass.miscTools.parallel_tools import get_default_workers
+from toolboxClass.miscTools.picture_cache import PictureCache
+from toolboxClass.miscTools.projection_tools import PoseCache
 
 logging.basicConfig(level=logging.ERROR)
 
@@ -47,12 +53,23 @@ class Mixin:
         self.c_pattern = None  # canvas
 
         # process variables
+        # density of the features of each camera and its heat map, None
+        # until it is shown after a change of the density
+        self.density_map = [None, None]
         self.heat_map = [None, None]
         self.img = [[[], [], [], [], [], []], [[], [], [], [], [], []]]
+        # pictures of the tabs to draw again when they are shown
+        self.panel_dirty = [[True] * 5, [True] * 5]
+        # pictures of the views already drawn, and the version of the
+        # projections they show
+        self.picture_cache = PictureCache()
+        self.projection_version = 0
         self.index.set(-1)
         self.index_corner.set(0)
         self.paths = [[], []]
-        self.img_original = [[], []]
+        # poses of the views for the projections
+        self.pose_cache = PoseCache()
+        self.img_original = [ImageStore(), ImageStore()]
         self.detected_features = [[], []]
         # total number of images (couple of images for the stereo mode)
         self.n_total.set(0)
@@ -65,11 +82,15 @@ class Mixin:
         # bar chart variables
         self.dr = [[], []]
 
-        # variable for selecting nearest image per click function
-        self.polygons = []
+        # variable for selecting nearest image per click function, a
+        # polygon per view of each camera
+        self.polygons = [[], []]
 
         # variable for importing files
         self.continue_importing = True
+        # background threads of the importing and the calibration
+        self.import_job = None
+        self.calibration_job = None
         self.ftypes = None
         self.valid_files = None
 
@@ -109,6 +130,35 @@ class Mixin:
             self.popup.wait_visibility()
             self.popup.grab_set()  # interact only with popup
 
+    def get_number_of_workers(self):
+        """Function to get the number of worker processes set in the calibration settings."""
+        try:
+            return max(self.p_workers.get(), 1)
+        except (ValueError, tk.TclError):
+            return 1
+
+    def get_memory_budget(self):
+        """Function to get the memory budget (bytes) for the full resolution images of each camera."""
+        try:
+            budget = max(self.p_memory.get(), 1) * 2 ** 20
+        except (ValueError, tk.TclError):
+            budget = DEFAULT_BUDGET
+        return budget // max(self.n_cameras, 1)
+
+    def get_heat_map_width(self, camera):
+        """Function to get the width of the grid of the heat map of a camera set in the calibration settings, at most the image width."""
+        try:
+            grid_width = max(self.p_heat_map_width.get(), 1)
+        except (ValueError, tk.TclError):
+            grid_width = DEFAULT_WIDTH
+        return min(grid_width, self.size[camera][1])
+
+    def get_cache_folder(self):
+        """Function to get the folder of the detection cache, None if the cache is disabled in the calibration settings."""
+        if self.p_cache.get():
+            return get_default_cache_folder()
+        return None
+
     def initialize_GUI_variables(self):
         """Function to initialize GUI related variables at the beginning."""
         # buttons
@@ -148,6 +198,19 @@ class Mixin:
         # calculation from clusters variables
         self.c_r = tk.IntVar()
         self.c_k = tk.IntVar()
+        # seed of the random groups, the same seed gives the same groups
+        self.c_seed = tk.IntVar()
+        self.c_seed.set(0)
+        # early stopping of the clustering calculation
+        self.c_adaptive = tk.BooleanVar()
+        self.c_tol_px = tk.DoubleVar()
+        self.c_tol_px.set(0.5)
+        self.c_tol_dist = tk.DoubleVar()
+        self.c_tol_dist.set(0.005)
+        self.c_tol_T = tk.DoubleVar()
+        self.c_tol_T.set(0.5)
+        self.c_time_budget = tk.DoubleVar()
+        self.c_time_budget.set(0)
         # bar chart variables
         self.f = [[], []]
         self.ax = [[], []]
@@ -157,6 +220,32 @@ class Mixin:
         self.p_fix_point = tk.BooleanVar()
         self.p_fix_ratio = tk.BooleanVar()
         self.p_zero_tangent_distance = tk.BooleanVar()
+        # start the subset calibrations from a calibration with all images
+        self.p_warm_start = tk.BooleanVar()
+        # stereo: intrinsics of each camera first, then R and T
+        self.p_two_stage = tk.BooleanVar()
+        # keep the results of each averaged subset for the export
+        self.p_keep_subsets = tk.BooleanVar()
+        self.p_keep_subsets.set(True)
+        # number of worker processes for detection and calibration
+        self.p_workers = tk.IntVar()
+        self.p_workers.set(get_default_workers())
+        # cache of the detected features
+        self.p_cache = tk.BooleanVar()
+        self.p_cache.set(True)
+        # coarse-to-fine detection for high resolution images, off by
+        # default since its corners may differ from the full resolution ones
+        self.p_pyramid = tk.BooleanVar()
+        self.p_pyramid.set(False)
+        # order of the preprocessing variants by their successes, the
+        # features then depend on the images detected before
+        self.p_adaptive_order = tk.BooleanVar()
+        # memory budget (MB) for the full resolution images
+        self.p_memory = tk.IntVar()
+        self.p_memory.set(2 * DEFAULT_BUDGET // 2 ** 20)
+        # width (cells) of the grid of the heat maps
+        self.p_heat_map_width = tk.IntVar()
+        self.p_heat_map_width.set(DEFAULT_WIDTH)
         # Variables for intrinsic and extrinsic parameters visualization
         # camera parameters
         self.fx = [tk.StringVar(), tk.StringVar()]
@@ -227,43 +316,11 @@ class Mixin:
 
         # checks
         if self._(u'Images') in self.pattern_load.get():
-            # creates object from Chessboard pattern
-            if self._(u'Chessboard') in self.pattern_type.get():
-                self.object_pattern = np.zeros((self.p_width
-                                                * self.p_height, 3),
-                                               np.float32)
-                grid = np.mgrid[0:self.p_height, 0:self.p_width] \
-                         .T.reshape(-1, 2) * self.f_distance
-                self.object_pattern[:, 0] = -grid[:, 1]
-                self.object_pattern[:, 1] = grid[:, 0]
-            # creates object from Grid pattern
-            elif self._(u'Asymmetric Grid') in self.pattern_type.get():
-                pattern_size = (self.p_height, self.p_width)
-                self.object_pattern = np.zeros((np.prod(pattern_size), 3),
-                                               np.float32)
-                self.object_pattern[:, :2] = np.fliplr(np.indices(pattern_size)
-                                                       .T.reshape(-1, 2))
-                for i in range(np.prod(pattern_size)):
-                    if self.object_pattern[i, 0] % 2 == 0:
-                        self.object_pattern[i, 1] = self.object_pattern[i, 1] \
-                                                   * self.f_distance
-                        self.object_pattern[i, 0] = self.object_pattern[i, 0] \
-                            * self.f_distance / 2
-                    else:
-                        self.object_pattern[i, 1] = self.object_pattern[i, 1] \
-                                                   * self.f_distance \
-                                                   + self.f_distance / 2
-                        self.object_pattern[i, 0] = self.object_pattern[i, 0] \
-                            * self.f_distance / 2
-            # returns for led pattern (not yet implemented)
-            elif self._(u'Symmetric Grid') in self.pattern_type.get():
-                self.object_pattern = np.zeros((self.p_width
-                                                * self.p_height, 3),
-                                               np.float32)
-                grid = np.mgrid[0:self.p_height, 0:self.p_width]\
-                         .T.reshape(-1, 2) * self.f_distance
-                self.object_pattern[:, 0] = -grid[:, 1]
-                self.object_pattern[:, 1] = grid[:, 0]
+            # creates object from the selected pattern type
+            self.object_pattern = get_object_pattern(self.get_pattern_name(),
+                                                     self.p_width,
+                                                     self.p_height,
+                                                     self.f_distance)
 
             # set default image type
             self.valid_files = ['.jpg', '.png']
@@ -640,6 +697,9 @@ class Mixin:
                                                        image=None))
             self.tabControl[j].grid(row=0, column=0,
                                     rowspan=13, sticky=tk.N + tk.S)
+            # only the picture of the shown tab is drawn
+            self.tabControl[j].bind('<<NotebookTabChanged>>',
+                                    lambda e, a=j: self.show_tab(a, e))
 
             self.list_panel[j][0]\
                 .bind('<Enter>', lambda event,
@@ -1,10 +1,11 @@
 import logging
-import os
 # import tkinter as tk
 from tkinter import filedialog
-import cv2
 import numpy as np
 import toolboxClass.miscTools.datastring as datastring
+import toolboxClass.miscTools.detection_tools as detection_tools
+from toolboxClass.miscTools.background_tools import BackgroundJob
+from toolboxClass.miscTools.misc_tools import get_sorted_files
 
 logging.basicConfig(level=logging.ERROR)
 
@@ -60,22 +61,7 @@ class Mixin:
                 else:
                     break
             for p in list_path:
-                file_no_path = []
-                for f in os.listdir(p):
-                    ext = os.path.splitext(f)[1]
-                    if ext.lower() not in self.valid_files:
-                        continue
-                    file_no_path.append(f)
-                try:
-                    # sorting files, based on:
-                    # https://stackoverflow.com/questions/33159106/
-                    # sort-filenames-in-directory-in-ascending-order
-                    file_no_path.sort(key=lambda f:
-                                      int(''.join(filter(str.isdigit, f))))
-                except ValueError:
-                    logging.warning(self._('non-indexable filenames'))
-                for f in file_no_path:
-                    filenames.append(os.path.join(p, f))
+                filenames += get_sorted_files(p, self.valid_files)
         return filenames
 
     def assign_filename(self, j):
@@ -109,6 +95,16 @@ class Mixin:
             self.updateCameraParametersGUI()
             self.loadBarError([0, 1])
 
+    def get_pattern_name(self):
+        """Function to get the name of the selected pattern type used by detection_tools."""
+        if self._(u'Chessboard') in self.pattern_type.get():
+            return detection_tools.CHESSBOARD
+        elif self._(u'Asymmetric Grid') in self.pattern_type.get():
+            return detection_tools.ASYMMETRIC_GRID
+        elif self._(u'Symmetric Grid') in self.pattern_type.get():
+            return detection_tools.SYMMETRIC_GRID
+        return None
+
     def add_file(self, typeof):
         """Function to add files to the session."""
         file_names_2D_points = self.get_file_names(typeof, self._('2D points'))
@@ -128,230 +124,196 @@ class Mixin:
         repeated_images = []
         no_valid_sized_images = []
 
+        n_files = len(file_names_2D_points)
+        # for stereo mode, the second half of the files corresponds to the
+        # right camera
+        cameras = [int(self.m_stereo and i >= n_files / 2)
+                   for i in range(n_files)]
+        # checks which images are repeated, in the session or in the selection
+        known_paths = [set(self.paths[0]), set(self.paths[1])]
+        repeated = []
+        for i, file_name_2D_points in enumerate(file_names_2D_points):
+            repeated.append(file_name_2D_points in known_paths[cameras[i]])
+            known_paths[cameras[i]].add(file_name_2D_points)
+
+        detections = None
+        variant_statistics = []
+        if '.txt' not in self.valid_files:
+            # detect the features of the new images in worker processes, the
+            # results are merged below in the order of the files
+            new_files = [f for f, r in zip(file_names_2D_points, repeated)
+                         if not r]
+            # image size of each camera if already initialized
+            shapes = [self.size[j] if self.paths[j] else None
+                      for j, r in zip(cameras, repeated) if not r]
+            # optionally, the preprocessing variants are ordered by their
+            # successes for each camera during this import
+            variant_statistics = [detection_tools.VariantStatistics(
+                self.get_pattern_name(), self.p_adaptive_order.get())
+                for _ in range(self.n_cameras)]
+            statistics = [variant_statistics[j]
+                          for j, r in zip(cameras, repeated) if not r]
+            detections = detection_tools.detect_in_files(
+                new_files, self.get_pattern_name(), self.p_height,
+                self.p_width, shapes, self.get_number_of_workers(),
+                self.get_cache_folder(), self.p_pyramid.get(), statistics)
+        text_files = '.txt' in self.valid_files
+
+        def read_files(post, cancelled):
+            """Function running in the background thread, it reads the files and posts (index, image, features) for each one."""
+            try:
+                for i, file_name_2D_points in enumerate(file_names_2D_points):
+                    if cancelled.is_set():
+                        break
+                    if repeated[i]:
+                        post((i, None, None))
+                    elif text_files:
+                        a = np.fromfile(file_name_2D_points,
+                                        dtype=np.float32, sep=',')
+                        post((i, None, a.reshape((int(len(a) / 2), 1, 2))))
+                    else:
+                        # get image file and its features
+                        im, features = next(detections)
+                        post((i, im, features))
+            finally:
+                if detections is not None:
+                    # cancel the detections of the images not merged
+                    detections.close()
+
+        for j in range(self.n_cameras):
+            self.img_original[j].set_budget(self.get_memory_budget())
+
         self.continue_importing = True
-        for i, _ in enumerate(file_names_2D_points):
-            if self.continue_importing:
-                message = self._('Processing {0} of {1} images\n').format(i + 1, len(file_names_2D_points))
-                l_msg.configure(text=message)
+        # the window closes as the cancel button does
+        self.popup.protocol('WM_DELETE_WINDOW',
+                            lambda: self.cancel_importing(b_cancel))
+        counter = [0]
+
+        def merge_files(events):
+            """Function to add the files read in the background to the session and show the progress."""
+            details = []
+            for i, im, features in events:
                 file_name_2D_points = file_names_2D_points[i]
-                j = 0
-                if self.m_stereo:
-                    # this corresponds to the right camera
-                    if i >= len(file_names_2D_points) / 2:
-                        j = 1
+                j = cameras[i]
+                counter[0] = i + 1
                 # checks if images isn't repeated
-                if file_name_2D_points not in self.paths[j]:
-                    if '.txt' not in self.valid_files:
-                        # read image file
-                        im = cv2.imread(file_name_2D_points, 0)
-                        # check if image size is already initialized
-                        if self.size[j] is None or len(self.paths[j]) == 0:
-                            self.size[j] = im.shape
-                            logging.debug('Initialized image size for camera %d...', j + 1)
-                        # check if image size is valid
-                        if im.shape == self.size[j]:
-                            ret = False
-                            features = None
-                            pre_processing = 4
-                            if self._(u'Symmetric Grid') in self.pattern_type.get():
-                                pre_processing = 8
-                            for process in range(pre_processing):
-                                if process == 0:
-                                    logging.debug(self._('Original image (Gray scale)'))
-                                    # creates copy of im, performance test found in
-                                    # https://stackoverflow.com/questions/48106028/ \
-                                    # python-copy-an-array-array
-                                    im2 = im * 1
-                                elif process == 1:
-                                    logging.debug(self._('Original image + Inverting image'))
-                                    im2 = 255 - im2
-                                elif process == 2:
-                                    logging.debug(self._('Normalized image (only)'))
-                                    im2 = cv2.normalize(im, None, 0, 255, cv2.NORM_MINMAX)
-                                elif process == 3:
-                                    logging.debug(self._('Normalized image + Inverting image'))
-                                    im2 = 255 - im2
-                                elif process == 4:
-                                    logging.debug(self._('Normalized image + Gaussian Blur'))
-                                    im2 = cv2.GaussianBlur(im*1, (11, 11), 0)
-                                elif process == 5:
-                                    logging.debug(self._('Normalized image + Gaussian Blur + Inverting image'))
-                                    im2 = 255 - im2
-                                elif process == 6:
-                                    logging.debug(self._('Normalized image + Dilate'))
-                                    L = 3
-                                    # initialize grid for the circle matrix
-                                    grid_circle = np.zeros((L * 2 + 1, L * 2 + 1))
-                                    # Assign values to the grid from 1.0 to 0.0 as a circle representation,
-                                    # where the center gets 1.0 and the radius gets 0.0
-                                    for k in range(L):
-                                        for ii in range(L - k, L + k + 1):
-                                            for jj in range(L - k, L + k + 1):
-                                                r = ((ii - L) ** 2 + (jj - L) ** 2) ** 0.5
-                                                if r <= k:
-                                                    grid_circle[ii, jj] = 1
-                                    kernel = grid_circle.astype(np.uint8)
-                                    im2 = cv2.dilate(im * 1, kernel, iterations=1)
-                                elif process == 7:
-                                    logging.debug(self._('Normalized image + Dilate + Inverting image'))
-                                    im2 = 255 - im2
-
-                                # find features for chessboard pattern type
-                                if self._(u'Chessboard') in self.pattern_type.get():
-                                    ret, features = \
-                                        cv2.findChessboardCorners(im2,
-                                                                  (self.p_height,
-                                                                   self.p_width))
-                                    if ret:
-                                        # EPS realistisch einstellen je nach
-                                        # Bildaufloesung (z.B fuer (240x320) 0.1, 0.25)
-                                        # improve feature detection
-                                        criteria = (cv2.TERM_CRITERIA_EPS
-                                                    + cv2.TERM_CRITERIA_MAX_ITER,
-                                                    130, 0.25)
-                                        cv2.cornerSubPix(im2, features, (3, 3),
-                                                         (-1, -1), criteria)
-                                        break
-                                # find features for asymmetric grid pattern type
-                                elif self._(u'Asymmetric Grid') \
-                                        in self.pattern_type.get():
-                                    features = np.array([], np.float32)
-                                    ret, features = \
-                                        cv2.findCirclesGrid(im2, (self.p_height,
-                                                                  self.p_width),
-                                                            features,
-                                                            cv2
-                                                            .CALIB_CB_ASYMMETRIC_GRID)
-                                    if ret:
-                                        break
-                                # find features for asymmetric grid pattern type
-                                elif self._(u'Symmetric Grid') \
-                                        in self.pattern_type.get():
-                                    features = np.array([], np.float32)
-                                    # Since the findCirclesGrid algorithm for symmetric
-                                    # grid usually fails for a wrong height - width
-                                    # configuration, we invert here those parameters.
-                                    for inner_cycle in range(2):
-                                        if inner_cycle == 0:
-                                            logging.debug(self._('height - width'))
-                                            ret, features = \
-                                                cv2.findCirclesGrid(
-                                                    im2,
-                                                    (self.p_height, self.p_width),
-                                                    features,
-                                                    cv2.CALIB_CB_SYMMETRIC_GRID)
-                                            if ret:
-                                                break
-                                        else:
-                                            logging.debug(self._('width - height'))
-                                            ret, features = \
-                                                cv2.findCirclesGrid(
-                                                    im2,
-                                                    (self.p_width, self.p_height),
-                                                    features,
-                                                    cv2.CALIB_CB_SYMMETRIC_GRID)
-
-                                            if ret:
-                                                # transform the detected features
-                                                # configuration to match the original
-                                                # (height, width)
-                                                features = features \
-                                                    .reshape(self.p_height,
-                                                             self.p_width,
-                                                             1, 2)
-                                                features = np.transpose(features,
-                                                                        (1, 0, 2, 3))
-                                                features = features \
-                                                    .reshape(self.p_width
-                                                             * self.p_height,
-                                                             1, 2)
-                                                break
-                                    if ret:
-                                        break
-                            # checks if the detection of features succeed
-                            if ret:
-                                # add file path to path
-                                self.paths[j].append(file_name_2D_points)
-                                # add original of image to img_original
-                                self.img_original[j].append(im)
-                                # add features to detected_features
-                                self.detected_features[j].append(features)
-                            else:
-                                # add image path to rejected_images
-                                rejected_images.append(file_name_2D_points)
-                                # add file path to path
-                                self.paths[j].append(None)
-                                # add original of image to img_original
-                                self.img_original[j].append(None)
-                                # add features to detected_features
-                                self.detected_features[j].append(None)
+                if repeated[i]:
+                    repeated_images.append(file_name_2D_points)
+                    details.append(self._('Repeated: {0}\n').format(file_name_2D_points))
+                elif not text_files:
+                    # check if image size is already initialized
+                    if im is not None and (self.size[j] is None or len(self.paths[j]) == 0):
+                        self.size[j] = im.shape
+                        logging.debug('Initialized image size for camera %d...', j + 1)
+                    # check if image size is valid
+                    if im is None or im.shape == self.size[j]:
+                        # checks if the detection of features succeed
+                        if features is not None:
+                            # add file path to path
+                            self.paths[j].append(file_name_2D_points)
+                            # add original of image to img_original, it
+                            # is read again from its file if dropped
+                            self.img_original[j].append(im, file_name_2D_points)
+                            # add features to detected_features
+                            self.detected_features[j].append(features)
+                            self.add_view_features(j, features)
                         else:
-                            # add image path to no_valid_sized_images
-                            no_valid_sized_images.append(file_name_2D_points)
+                            # add image path to rejected_images
+                            rejected_images.append(file_name_2D_points)
+                            details.append(self._('Rejected: {0}\n').format(file_name_2D_points))
                             # add file path to path
                             self.paths[j].append(None)
                             # add original of image to img_original
                             self.img_original[j].append(None)
                             # add features to detected_features
                             self.detected_features[j].append(None)
-
+                            self.add_view_features(j, None)
                     else:
-                        if self.size[j] is None or len(self.paths[j]) == 0:
-                            self.size[j] = (self.image_height.get(),self.image_width.get())
-                            logging.debug('Initialized image size for camera %d...', j + 1)
-                        a = np.fromfile(file_name_2D_points,
-                                        dtype=np.float32, sep=',')
-                        a = a.reshape((int(len(a) / 2), 1, 2))
-                        self.p_height = 1
-                        self.p_width = len(a)
+                        # add image path to no_valid_sized_images
+                        no_valid_sized_images.append(file_name_2D_points)
+                        details.append(self._('Invalid sized: {0}\n').format(file_name_2D_points))
                         # add file path to path
-                        self.paths[j].append(file_name_2D_points)
+                        self.paths[j].append(None)
                         # add original of image to img_original
-                        im = np.zeros(self.size[j])
-                        self.img_original[j].append(im)
+                        self.img_original[j].append(None)
                         # add features to detected_features
-                        self.detected_features[j].append(a)
+                        self.detected_features[j].append(None)
+                        self.add_view_features(j, None)
                 else:
-                    repeated_images.append(file_name_2D_points)
+                    if self.size[j] is None or len(self.paths[j]) == 0:
+                        self.size[j] = (self.image_height.get(),self.image_width.get())
+                        logging.debug('Initialized image size for camera %d...', j + 1)
+                    self.p_height = 1
+                    self.p_width = len(features)
+                    # add file path to path
+                    self.paths[j].append(file_name_2D_points)
+                    # add original of image to img_original, it is
+                    # always kept since it has no image file
+                    im = np.zeros(self.size[j])
+                    self.img_original[j].append(im)
+                    # add features to detected_features
+                    self.detected_features[j].append(features)
+                    self.add_view_features(j, features)
 
-                # percentage of completion of process
-                c_percent = (i + 1) / float(len(file_names_2D_points))
-                self.progbar['value'] = c_percent * 10.0
-                # update label
-                self.style_pg.configure('text.Horizontal.TProgressbar',
-                                        text='{:g} %'.format(int(c_percent * 100)))
-                # if one or more images failed the importing, add info
-                message += self._('Imported: {0}\n').format(i + 1 - len(rejected_images) - len(repeated_images) - len(no_valid_sized_images))
-                message += self._('Rejected: {0}\n').format(len(rejected_images))
-                message += self._('Repeated: {0}\n').format(len(repeated_images))
-                message += self._('Invalid sized: {0}\n').format(len(no_valid_sized_images))
-                l_msg.configure(text=message)
-                message = ''
-                if rejected_images:
-                    message += self._('Rejected: \n{0}\n').format('\n'.join(rejected_images))
-                if repeated_images:
-                    message += self._('Repeated: \n{0}\n').format('\n'.join(repeated_images))
-                if no_valid_sized_images:
-                    message += self._('Invalid sized images: \n{0}\n').format('\n'.join(no_valid_sized_images))
+            # the popup may have been closed while importing
+            if not self.continue_importing or not l_msg.winfo_exists():
+                return
+            i = counter[0]
+            # percentage of completion of process
+            c_percent = i / float(len(file_names_2D_points))
+            self.progbar['value'] = c_percent * 10.0
+            # update label
+            self.style_pg.configure('text.Horizontal.TProgressbar',
+                                    text='{:g} %'.format(int(c_percent * 100)))
+            # if one or more images failed the importing, add info
+            message = self._('Processing {0} of {1} images\n').format(i, len(file_names_2D_points))
+            message += self._('Imported: {0}\n').format(i - len(rejected_images) - len(repeated_images) - len(no_valid_sized_images))
+            message += self._('Rejected: {0}\n').format(len(rejected_images))
+            message += self._('Repeated: {0}\n').format(len(repeated_images))
+            message += self._('Invalid sized: {0}\n').format(len(no_valid_sized_images))
+            l_msg.configure(text=message)
+            # only the new files are added to the details
+            if details:
                 text_detail.config(state='normal')
-                text_detail.delete(1.0, 'end')
-                text_detail.insert(1.0, message)
+                text_detail.insert('end', ''.join(details))
                 text_detail.config(state='disable')
 
-                self.popup.update()
-            else:
-                message = self._('Processed {0} of {1} images\n').format(i + 1, len(file_names_2D_points))
-                message += self._('Imported: {0}\n').format(i + 1 - len(rejected_images) - len(repeated_images) - len(no_valid_sized_images))
+        def finish_importing(result, error):
+            """Function to finish the importing when the background thread ends."""
+            self.import_job = None
+            if not l_msg.winfo_exists():
+                self.remove_rejected_files()
+                return
+            if not self.continue_importing:
+                i = counter[0]
+                message = self._('Processed {0} of {1} images\n').format(i, len(file_names_2D_points))
+                message += self._('Imported: {0}\n').format(i - len(rejected_images) - len(repeated_images) - len(no_valid_sized_images))
                 message += self._('Rejected: {0}\n').format(len(rejected_images))
                 message += self._('Repeated: {0}\n').format(len(repeated_images))
                 message += self._('Invalid sized: {0}\n').format(len(no_valid_sized_images))
                 l_msg.configure(text=message)
-                l_msg.configure(text=message)
-                break
+            # add the hit rate and time of the preprocessing variants
+            message = ''
+            for j, stats in enumerate(variant_statistics):
+                lines = stats.summary()
+                logging.info('Detection variants camera %d: %s', j + 1, lines)
+                if lines:
+                    message += self._('Detection variants (camera {0}): \n{1}\n').format(j + 1, '\n'.join(lines))
+                if stats.from_cache:
+                    message += self._('Read from cache (camera {0}): {1}\n').format(j + 1, stats.from_cache)
+            text_detail.config(state='normal')
+            text_detail.insert('end', message)
+            text_detail.config(state='disable')
+
+            if self.continue_importing:
+                self.cancel_importing(b_cancel)
+            self.remove_rejected_files()
 
-        if self.continue_importing:
-            self.cancel_importing(b_cancel)
+        self.import_job = BackgroundJob(self.master, read_files, merge_files,
+                                        finish_importing).start()
 
+    def remove_rejected_files(self):
+        """Function to remove the rejected files from the session after importing and update the GUI."""
         index_to_delete = [i for i,
                            v in enumerate(self.paths[0]) if v is None]
         if self.m_stereo:
@@ -363,6 +325,7 @@ class Mixin:
         # delete rejected images
         for j in range(self.n_cameras):
             for i in list(index_to_delete):
+                self.remove_view_features(j, i)
                 del self.paths[j][i]
                 del self.img_original[j][i]
                 del self.detected_features[j][i]
@@ -5,6 +5,7 @@ import numpy as np
 from PIL import Image, ImageTk
 from matplotlib import cm
 import matplotlib.pyplot as plt
+from toolboxClass.miscTools.heat_map import DensityAccumulator
 
 logging.basicConfig(level=logging.ERROR)
 
@@ -56,9 +57,8 @@ class Mixin:
         # check if there are loaded images and if the locate button in enable
         elif self.paths[camera] and self.btn_locate.config('relief')[-1] == 'sunken':
             selection = 1
-            for poly in self.polygons:
-                contains, _ = poly.contains(event)
-                if contains:
+            for poly in self.polygons[camera]:
+                if poly is not None and poly.contains(event)[0]:
                     self.listbox.selection_clear(0, tk.END)
                     self.index.set(selection - 1)
                     # This make sense for update by click in bar chart
@@ -123,8 +123,9 @@ class Mixin:
         """Function to change feature position."""
         for camera in range(self.n_cameras):
             if self.new_coord_feature[camera]:
-                self.detected_features[camera][self.index.get()][self.index_corner.get()] = self.new_coord_feature[
-                    camera]
+                features = self.detected_features[camera][self.index.get()].copy()
+                features[self.index_corner.get()] = self.new_coord_feature[camera]
+                self.replace_view_features(camera, self.index.get(), features)
         self.popup.destroy()
         self.updatePicture()
 
@@ -153,65 +154,30 @@ class Mixin:
     def updatePicture(self, *args):
         """Function to update pictures in panel of tabs."""
         selection = self.index.get()
+        # all the pictures change, they are drawn when their tab is shown
+        for j in range(self.n_cameras):
+            self.panel_dirty[j] = [True] * len(self.list_panel[j])
         # checks for a valid selection
         if selection >= 0:
             # update selection in data browser
             self.listbox.activate(selection)
-            images = []
-            for j in range(self.n_cameras):
-                images.append([])
-                # get original of the selected image
-                images[j].append(Image.fromarray(
-                        self.img_original[j][selection]))
-                # get images with marked features of the selected image
-                if self.paths[j] and self.btn_move_feature.config('relief')[-1] == 'sunken':
-                    images[j].append(Image.fromarray(self.show_moving_features(j, selection)))
-                else:
-                    images[j].append(Image.fromarray(self.image_features(j, selection)))
-                # get heat_map for all the images in camera
-                images[j].append(Image.fromarray(
-                        self.heat_map[j]))
-                # get projection image with intrinsic parameters of the
-                # selected image
-                images[j].append(Image.fromarray(
-                        self.project_detected_features(j, selection)))
-                # get projection image with the intrinsics of the other camera
-                # and extrinsics between the cameras of the selected image
-                images[j].append(Image.fromarray(
-                        self.project_detected_features(j,
-                                                       selection,
-                                                       forExtrinsics=True)))
             # scale image if zoom applies and update panel of tabs
             if self.zoomhandler != 0:
-                width, height = DEFAULT_WIDTH, DEFAULT_HEIGHT
-                new_size = int(self.imscale * width), int(self.imscale
-                                                          * height)
                 for j in range(self.n_cameras):
                     for i in range(len(self.list_panel[j])):
                         self.list_panel[j][i].scale('all', self.x, self.y,
                                                     self.scale, self.scale)
-                        self.img[j][i] = ImageTk.PhotoImage(
-                                    images[j][i].resize(new_size))
-                        self.list_panel[j][i].itemconfig(
-                                    self.list_image_on_panel[j][i],
-                                    image=self.img[j][i])
             # Update panel of tabs
             else:
                 self.imscale = 1
-                width, height = DEFAULT_WIDTH, DEFAULT_HEIGHT
-                new_size = int(self.imscale * width), int(self.imscale
-                                                          * height)
                 for j in range(self.n_cameras):
                     for i in range(len(self.list_panel[j])):
                         self.list_panel[j][i].scale('all', 0, 0, 1, 1)
                         self.list_panel[j][i].coords(
                                 self.list_image_on_panel[j][i], 0, 0)
-                        self.img[j][i] = ImageTk.PhotoImage(
-                                images[j][i].resize(new_size))
-                        self.list_panel[j][i].itemconfig(
-                                self.list_image_on_panel[j][i],
-                                image=self.img[j][i])
             self.scale = 1
+            for j in range(self.n_cameras):
+                self.show_tab(j)
 
         # for no valid selection, update with empty picture the panel of tabs
         else:
@@ -224,6 +190,71 @@ class Mixin:
                                                            + tk.W,
                                                            image=None)
 
+    def show_tab(self, camera, *args):
+        """Function to draw the picture of the shown tab of a camera, if it changed since it was drawn."""
+        selection = self.index.get()
+        i = self.tabControl[camera].index(self.tabControl[camera].select())
+        if selection < 0 or camera >= self.n_cameras or \
+                not self.panel_dirty[camera][i]:
+            return
+        key = self.picture_key(camera, i, selection)
+        picture = None if key is None else self.picture_cache.get(key)
+        if picture is None:
+            width, height = DEFAULT_WIDTH, DEFAULT_HEIGHT
+            new_size = int(self.imscale * width), int(self.imscale * height)
+            picture = ImageTk.PhotoImage(
+                    self.tab_picture(camera, i, selection).resize(new_size))
+            if key is not None:
+                # memory of the picture, 4 bytes per pixel
+                self.picture_cache.put(key, picture,
+                                       4 * new_size[0] * new_size[1])
+        self.img[camera][i] = picture
+        self.list_panel[camera][i].itemconfig(
+                self.list_image_on_panel[camera][i], image=self.img[camera][i])
+        self.panel_dirty[camera][i] = False
+
+    def picture_key(self, camera, tab, selection):
+        """Function to get the key of the picture of a tab in the picture cache, None if it is not cached."""
+        path = self.paths[camera][selection]
+        # the heat map does not depend on the view and keeps its own copy,
+        # the moving features change with each click
+        if path is None or tab == 2 or (
+                tab == 1 and self.btn_move_feature.config('relief')[-1] == 'sunken'):
+            return None
+        if tab == 0:
+            # the original does not depend on the marked corner nor on the
+            # projections
+            return (camera, path, tab, self.zoomhandler)
+        return (camera, path, tab, self.zoomhandler, self.index_corner.get(),
+                self.projection_version)
+
+    def tab_picture(self, camera, tab, selection):
+        """Function to get the picture of a tab (original, features, cloud map, intrinsic, extrinsic) for the selected image."""
+        if tab == 0:
+            # get original of the selected image, the preview is enough
+            # for the panel without zoom
+            if self.zoomhandler == 0:
+                return Image.fromarray(self.img_original[camera].preview(selection))
+            return Image.fromarray(self.img_original[camera][selection])
+        if tab == 1:
+            # get images with marked features of the selected image
+            if self.paths[camera] and self.btn_move_feature.config('relief')[-1] == 'sunken':
+                return Image.fromarray(self.show_moving_features(camera, selection))
+            return Image.fromarray(self.image_features(camera, selection))
+        if tab == 2:
+            # get heat_map for all the images in camera
+            return Image.fromarray(self.get_heat_map(camera))
+        if tab == 3:
+            # get projection image with intrinsic parameters of the
+            # selected image
+            return Image.fromarray(self.project_detected_features(camera,
+                                                                  selection))
+        # get projection image with the intrinsics of the other camera
+        # and extrinsics between the cameras of the selected image
+        return Image.fromarray(self.project_detected_features(camera,
+                                                              selection,
+                                                              forExtrinsics=True))
+
     # self.panel1.itemconfig(self.image_on_panel1, image = None)
 
     def image_features(self, camera, index):
@@ -245,96 +276,94 @@ class Mixin:
         return im2
 
     def update_added_deleted(self, *args):
-        """Function to update heat map when a new image is added or an image is deleted."""
-        self.polygons = []
-        DEFAULT_WIDTH = 320
-        DEFAULT_HEIGHT = 240
+        """Function to update the data browser when a new image is added or an image is deleted."""
+        # the heat maps and the polygons are updated with each view
         self.zoomhandler = 0
-        if self.n_total.get() > 0:
-            for j in range(self.n_cameras):
-                # recalculate heat_map
-                self.heat_map[j] = self.density_cloud_heat_map(j)
-        for j in range(self.n_cameras):
-            width = self.size[j][1]
-            height = self.size[j][0]
-            for i in range(len(self.paths[0])):
-                geometry = []
-                points = [0,self.p_height-1,self.p_width*self.p_height-1,self.p_width*self.p_height-self.p_height]
-                for p in points:
-                    c = self.detected_features[j][i][p]
-                    x_p = c[0][0]*DEFAULT_WIDTH/width
-                    y_p = c[0][1]*DEFAULT_HEIGHT/height
-                    geometry.append([x_p, y_p])
-                poly = plt.Polygon(geometry)
-                self.polygons.append(poly)
         # update data browser
         self.loadImagesBrowser()
 
-    def density_cloud_heat_map(self, camera):
-        """Function to calculate a density cloud map of all the images using its detected features."""
-        # initialize picture with image size
+    def locate_polygon(self, camera, features):
+        """Function to get the polygon of the pattern corners of a view in the panel, used for locating it per click."""
         width = self.size[camera][1]
         height = self.size[camera][0]
-        grid = np.zeros((height, width))
-        # get detected features for the camera
-        list_features = self.detected_features[camera]
-        # create circle matrix for each pattern #
-        # calculate number of pixel as the radius of the circle for each
-        # feature depending of the width
-        L = int(round(0.006 * width + 8))
-        step = 1.0 / L
-        # initialize grid for the circle matrix
-        grid_circle = np.zeros((L * 2 + 1, L * 2 + 1))
-        # Assign values to the grid from 1.0 to 0.0 as a circle representation,
-        # where the center gets 1.0 and the radius gets 0.0
-        for k in range(L):
-            for i in range(L - k, L + k + 1):
-                for j in range(L - k, L + k + 1):
-                    r = ((i - L) ** 2 + (j - L) ** 2) ** 0.5
-                    if r <= k:
-                        grid_circle[i, j] += step
-        # for each point in the list of features overlay the circle matrix,
-        # considering the width and height of the image
-        for k in list_features:
-            for c in k:
-                x = int(c[0][1])
-                y = int(c[0][0])
-                x_min = 0
-                x_max = height
-                y_min = 0
-                y_max = width
-                x_min_g = 0
-                x_max_g = L * 2 + 1
-                y_min_g = 0
-                y_max_g = L * 2 + 1
-
-                if x - L < 0:
-                    x_min_g -= x - L
-                else:
-                    x_min += x - L
-                if x + L + 1 > height:
-                    x_max_g = x_max - x_min
-                else:
-                    x_max = x + L + 1
-                if y - L < 0:
-                    y_min_g -= y - L
-                else:
-                    y_min += y - L
-                if y + L + 1 > width:
-                    y_max_g = y_max - y_min
-                else:
-                    y_max = y + L + 1
-
-                # TODO: Show errors
-                grid[x_min:x_max, y_min:y_max] += grid_circle[x_min_g:x_max_g,
-                                                              y_min_g:y_max_g]
-
-        # normalized the picture
-        grid = ((grid - grid.min()) / (grid.max() - grid.min()))
+        geometry = []
+        points = [0, self.p_height - 1, self.p_width * self.p_height - 1,
+                  self.p_width * self.p_height - self.p_height]
+        for p in points:
+            c = features[p]
+            x_p = c[0][0] * DEFAULT_WIDTH / width
+            y_p = c[0][1] * DEFAULT_HEIGHT / height
+            geometry.append([x_p, y_p])
+        return plt.Polygon(geometry)
+
+    def add_view_features(self, camera, features):
+        """Function to add the features of a new view (None if rejected) to the heat map and the polygons."""
+        if features is None:
+            self.polygons[camera].append(None)
+            return
+        density = self.current_density_map(camera)
+        if density is not None:
+            density.add(features)
+        self.heat_map[camera] = None
+        self.polygons[camera].append(self.locate_polygon(camera, features))
+
+    def remove_view_features(self, camera, index):
+        """Function to remove the features of a view from the heat map, the polygons and the picture and pose caches, before deleting it."""
+        features = self.detected_features[camera][index]
+        self.picture_cache.discard((camera, self.paths[camera][index]))
+        self.pose_cache.remove(camera, self.paths[camera][index])
+        density = self.current_density_map(camera)
+        if features is not None and density is not None:
+            density.remove(features)
+        self.heat_map[camera] = None
+        del self.polygons[camera][index]
+
+    def replace_view_features(self, camera, index, features):
+        """Function to change the features of a view, e.g. after moving one of them."""
+        density = self.current_density_map(camera)
+        if density is not None:
+            density.remove(self.detected_features[camera][index])
+            density.add(features)
+        self.heat_map[camera] = None
+        self.polygons[camera][index] = self.locate_polygon(camera, features)
+        self.detected_features[camera][index] = features
+        self.picture_cache.discard((camera, self.paths[camera][index]))
+
+    def current_density_map(self, camera):
+        """Function to get the density of the features of a camera, None if it has to be built again."""
+        density = self.density_map[camera]
+        # the image size is initialized again when the camera has no views
+        # and the grid width can be changed in the calibration settings
+        if density is None or \
+                (density.height, density.width, density.grid_width) != \
+                tuple(self.size[camera][:2]) + (self.get_heat_map_width(camera),):
+            return None
+        return density
+
+    def get_density_map(self, camera):
+        """Function to get the density of the features of a camera, built again with all its views if needed."""
+        density = self.current_density_map(camera)
+        if density is None:
+            height, width = self.size[camera][:2]
+            density = DensityAccumulator(height, width,
+                                         self.get_heat_map_width(camera))
+            density.build(self.detected_features[camera])
+            self.density_map[camera] = density
+        return density
+
+    def get_heat_map(self, camera):
+        """Function to get the heat map of a camera, the colormap is applied again only if the density changed."""
+        if self.heat_map[camera] is None or \
+                self.current_density_map(camera) is None:
+            self.heat_map[camera] = self.density_cloud_heat_map(camera)
+        return self.heat_map[camera]
 
-        # for k in list_features:
-        #    for c in k:
-        #        grid[int(c[0][1]),int(c[0][0])]=1.0
+    def density_cloud_heat_map(self, camera):
+        """Function to calculate a density cloud map of all the images using its detected features."""
+        # normalized density of the features, each one spread as a circle
+        # with a radius depending of the width, in the grid of the heat map
+        # which is scaled as the other pictures to the panel size
+        grid = self.get_density_map(camera).get_grid()
 
         # create heatmap of the normalized picture. Check:
         # https://stackoverflow.com/questions/10965417/how-to-convert-numpy-
@@ -440,7 +469,7 @@ class Mixin:
             index = self.index_corner.get()
         for j in range(self.n_cameras):
             # TODO maybe save old index?
-            if self.r_error[j]:
+            if self.r_error[j] is not None:
                 for i in range(len(self.dr[k][j])):
                     if i == index:
                         self.dr[k][j][i].set_color('#9a1046')
@@ -464,12 +493,12 @@ class Mixin:
                 # getting error data depending of the chart type
                 # (RMS reprojection error or pixel distance error)
                 if k == 0:
-                    if self.r_error[j]:
+                    if self.r_error[j] is not None:
                         data = self.r_error[j]
                         m_error = np.mean(data)
                         index = self.index.get()
                 else:
-                    if self.r_error_p[j]:
+                    if self.r_error_p[j] is not None:
                         # converted to size-1 arrays
                         data = self.r_error_p[j][self.index.get()].T[0]
                         index = self.index_corner.get()
@@ -32,9 +32,50 @@ class Mixin:
             .grid(row=3, column=0, sticky=tk.W)
         tk.Checkbutton(self.popup, variable=self.p_zero_tangent_distance)\
             .grid(row=3, column=1, sticky=tk.E + tk.W + tk.N)
+        vcmd_int = (self.popup.register(validate), '%d', '%i', '%P', '%s',
+                    '%S', '%v', '%V', '%W', '0123456789')
+        tk.Label(self.popup, text=self._(u'Number of worker processes'))\
+            .grid(row=4, column=0, sticky=tk.W)
+        tk.Entry(self.popup, textvariable=self.p_workers, width=4,
+                 validate='key', validatecommand=vcmd_int)\
+            .grid(row=4, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text=self._(u'Cache detected features'))\
+            .grid(row=5, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.p_cache)\
+            .grid(row=5, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text=self._(u'Memory for images (MB)'))\
+            .grid(row=6, column=0, sticky=tk.W)
+        tk.Entry(self.popup, textvariable=self.p_memory, width=6,
+                 validate='key', validatecommand=vcmd_int)\
+            .grid(row=6, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text=self._(u'Coarse-to-fine detection'))\
+            .grid(row=7, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.p_pyramid)\
+            .grid(row=7, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text=self._(u'Warm start from all images'))\
+            .grid(row=8, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.p_warm_start)\
+            .grid(row=8, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text=self._(u'Stereo: intrinsics first'))\
+            .grid(row=9, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.p_two_stage)\
+            .grid(row=9, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text=self._(u'Heat map width (cells)'))\
+            .grid(row=10, column=0, sticky=tk.W)
+        tk.Entry(self.popup, textvariable=self.p_heat_map_width, width=6,
+                 validate='key', validatecommand=vcmd_int)\
+            .grid(row=10, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text=self._(u'Adaptive detection order (not reproducible)'))\
+            .grid(row=11, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.p_adaptive_order)\
+            .grid(row=11, column=1, sticky=tk.E + tk.W + tk.N)
+        tk.Label(self.popup, text=self._(u'Keep the results of each group (export)'))\
+            .grid(row=12, column=0, sticky=tk.W)
+        tk.Checkbutton(self.popup, variable=self.p_keep_subsets)\
+            .grid(row=12, column=1, sticky=tk.E + tk.W + tk.N)
         tk.Button(self.popup, text=self._(u'Exit'),
                   command=self.popup.destroy)\
-            .grid(row=4, column=0, columnspan=2, sticky=tk.E + tk.W + tk.N)
+            .grid(row=13, column=0, columnspan=2, sticky=tk.E + tk.W + tk.N)
         self.center()
 
     def pattern_default(self, *args):
@@ -442,10 +483,20 @@ class Mixin:
             # set GUI for clustering
             self.m_frm[1].grid(row=3, column=0, sticky=tk.N + tk.S)
             self.m_frm[0].grid_forget()
+            self.m_frm[3].grid_forget()
+        elif self._('Fast') in self.how_to_calibrate.get():
+            for j in range(1, 5):
+                self.label_status_f[j][1].config(text='')
+                self.label_status_f[j][2].config(text='')
+            # set GUI for the fast uncertainty
+            self.m_frm[3].grid(row=3, column=0, sticky=tk.N + tk.S)
+            self.m_frm[0].grid_forget()
+            self.m_frm[1].grid_forget()
         elif self._('Load') in self.how_to_calibrate.get():
             # set GUI for Loading File
             self.m_frm[0].grid(row=2, column=0, sticky=tk.N + tk.S)
             self.m_frm[1].grid_forget()
+            self.m_frm[3].grid_forget()
 
     def popupmsg(self):
         """Function to show popup with information about the importing images process."""
@@ -485,6 +536,8 @@ class Mixin:
         """Function to cancel the importing images process and when finished, close the popup."""
         if 'Cancel' in button.cget('text'):
             self.continue_importing = False
+            if self.import_job is not None:
+                self.import_job.cancel()
             button.configure(text=self._('Exit'))
         else:
             self.popup.destroy()
@@ -515,6 +568,7 @@ class Mixin:
                                                             + tk.N)
         tk.OptionMenu(self.f_frm, self.how_to_calibrate,
                       self._(u'Clustering calculation'),
+                      self._(u'Fast uncertainty'),
                       self._(u'Load from file'),
                       command=self.modify_play_popup).grid(row=1, column=0,
                                                            sticky=tk.E
@@ -525,10 +579,11 @@ class Mixin:
                     '%S', '%v', '%V', '%W', '0123456789')
 
         self.m_frm = []
-        for i in range(3):
+        for i in range(4):
             self.m_frm.append(tk.Frame(self.popup))
             self.m_frm[-1].grid(row=2 + i, column=0)
         self.m_frm[0].grid_forget()
+        self.m_frm[3].grid_forget()
 
         # struct popup load from file (m_frm[0]) #
         # ------------------------------
@@ -637,6 +692,8 @@ class Mixin:
         # ------------------------------------
         # |              (c_r)               |
         # ------------------------------------
+        # | Seed of the groups    (c_seed)   |
+        # ------------------------------------
         # |         >>>>(progbar)>>>>        |
         # ------------------------------------
         # |            (lb_time)             |
@@ -678,18 +735,51 @@ class Mixin:
                                      fg='red')
         self.label_msg[1].grid(row=8, column=0, sticky=tk.W)
 
+        seed_frame = tk.Frame(self.m_frm[1])
+        seed_frame.grid(row=9, column=0, sticky=tk.W + tk.E)
+        tk.Label(seed_frame, text=self._(u'Seed of the groups'))\
+            .grid(row=0, column=0, sticky=tk.W)
+        tk.Entry(seed_frame, textvariable=self.c_seed, width=8,
+                 validate='key', validatecommand=vcmd_int)\
+            .grid(row=0, column=1, sticky=tk.E + tk.W)
+
+        # early stopping, the calibration ends before k groups when the
+        # standard errors of the parameters are below the tolerances or
+        # when the time budget is spent
+        vcmd_float = (self.popup.register(validate), '%d', '%i', '%P', '%s',
+                      '%S', '%v', '%V', '%W', '0123456789.')
+        stop_frame = tk.Frame(self.m_frm[1])
+        stop_frame.grid(row=10, column=0, sticky=tk.W + tk.E)
+        tk.Checkbutton(stop_frame, variable=self.c_adaptive,
+                       text=self._(u'Stop when converged'))\
+            .grid(row=0, column=0, columnspan=2, sticky=tk.W)
+        stop_settings = [(self._(u'Tolerance fx, fy, cx, cy (px)'),
+                          self.c_tol_px),
+                         (self._(u'Tolerance k1...k5'), self.c_tol_dist),
+                         (self._(u'Tolerance T (mm)'), self.c_tol_T),
+                         (self._(u'Time budget (s, 0 = none)'),
+                          self.c_time_budget)]
+        if not self.m_stereo:
+            del stop_settings[2]
+        for row, (text, variable) in enumerate(stop_settings):
+            tk.Label(stop_frame, text=text).grid(row=row + 1, column=0,
+                                                 sticky=tk.W)
+            tk.Entry(stop_frame, textvariable=variable, width=8,
+                     validate='key', validatecommand=vcmd_float)\
+                .grid(row=row + 1, column=1, sticky=tk.E + tk.W)
+
         # set initial text progressbar
         self.style_pg.configure('text.Horizontal.TProgressbar', text='0 %')
         self.progbar = ttk.Progressbar(self.m_frm[1],
                                        style='text.Horizontal.TProgressbar')
         self.progbar.config(maximum=10, mode='determinate')
-        self.progbar.grid(row=9, column=0, sticky=tk.E + tk.W)
+        self.progbar.grid(row=11, column=0, sticky=tk.E + tk.W)
 
         self.lb_time = tk.Label(self.m_frm[1], font='TkDefaultFont 6')
-        self.lb_time.grid(row=10, column=0, sticky=tk.W + tk.E)
+        self.lb_time.grid(row=12, column=0, sticky=tk.W + tk.E)
 
         aux_frame = tk.Frame(self.m_frm[1])
-        aux_frame.grid(row=11, column=0, sticky=tk.W + tk.E + tk.N + tk.S)
+        aux_frame.grid(row=13, column=0, sticky=tk.W + tk.E + tk.N + tk.S)
 
         # struct for label_status #
         # -------------------------------------------------
@@ -723,13 +813,55 @@ class Mixin:
         self.label_status[4][0].config(text=self._(u'4. Calculating Error'))
         self.label_status[5][0].config(text=self._(u'TOTAL'))
 
+        # struct popup fast uncertainty (m_frm[3]) #
+        # ------------------------------------
+        # How to get camera parameters       |
+        # ------------------------------------
+        # | Fast uncertainty             |*| |
+        # ------------------------------------
+        # |         (label_status_f)         |
+        # ------------------------------------
+        # || Calibrate ||       ||Exit      ||
+        # ------------------------------------
+
+        # struct for label_status_f #
+        # -------------------------------------------------
+        # | Steps                      | State | Time (s) |
+        # -------------------------------------------------
+        # | 1. Calibrating all images  |       |          |
+        # -------------------------------------------------
+        # | 2. Calculating Projections |       |          |
+        # -------------------------------------------------
+        # | 3. Calculating Error       |       |          |
+        # -------------------------------------------------
+        # | TOTAL                      |       |          |
+        # -------------------------------------------------
+        self.label_status_f = []
+        for j in range(5):
+            self.label_status_f.append([])
+            for i in range(3):
+                label = tk.Label(self.m_frm[3])
+                label.grid(row=j, column=i, sticky=tk.W)
+                self.label_status_f[j].append(label)
+
+        self.label_status_f[0][0].config(text=self._(u'Steps'))
+        self.label_status_f[0][1].config(text=self._(u'State'))
+        self.label_status_f[0][2].config(text=self._(u'Time (s)'))
+        self.label_status_f[1][0].config(text=self
+                                         ._(u'1. Calibrating all images'))
+        self.label_status_f[2][0].config(text=self
+                                         ._(u'2. Calculating Projections'))
+        self.label_status_f[3][0].config(text=self._(u'3. Calculating Error'))
+        self.label_status_f[4][0].config(text=self._(u'TOTAL'))
+
         # added reference to disable button while play
         calib_button = tk.Button(self.m_frm[2], text=self._(u'Calibrate'))
         calib_button.config(command=lambda: self.play(calib_button))
         calib_button.grid(row=0, column=0, sticky=tk.E + tk.W + tk.N)
         tk.Button(self.m_frm[2], text=self._(u'Exit'),
-                  command=self.popup.destroy).grid(row=0, column=1,
-                                                   sticky=tk.E + tk.W + tk.N)
+                  command=self.exit_play_popup).grid(row=0, column=1,
+                                                     sticky=tk.E + tk.W + tk.N)
+        self.popup.protocol('WM_DELETE_WINDOW', self.exit_play_popup)
 
         self.f_frm.bind('<Enter>', lambda event,
                         message=self._(u'Choose between .'):
@@ -751,6 +883,13 @@ class Mixin:
                                           u'images should be selected '
                                           u'usually.'):
                            self.entry_mouse_enter(event, message))
+        self.m_frm[3].bind('<Enter>', lambda event,
+                           message=self._(u'One calibration with all the '
+                                          u'images, the standard deviations '
+                                          u'of the parameters are estimated '
+                                          u'by OpenCV \ninstead of '
+                                          u'calibrating k groups.'):
+                           self.entry_mouse_enter(event, message))
         self.m_frm[2].bind('<Enter>', lambda event,
                            message=self._(u'Start of the calibration.'):
                            self.entry_mouse_enter(event, message))
@@ -758,6 +897,7 @@ class Mixin:
         self.m_frm[0].bind('<Leave>', self.entry_mouse_leave)
         self.m_frm[1].bind('<Leave>', self.entry_mouse_leave)
         self.m_frm[2].bind('<Leave>', self.entry_mouse_leave)
+        self.m_frm[3].bind('<Leave>', self.entry_mouse_leave)
 
         self.modify_play_popup()
         self.center()
@@ -12,7 +12,7 @@ class Mixin:
         self.zoomhandler = 0
         if widget.curselection():
             self.index.set(widget.curselection()[0])
-        if self.r_error[0]:
+        if self.r_error[0] is not None:
             self.loadBarError([1])
             self.updateBarError(0)
 
@@ -38,29 +38,40 @@ class Mixin:
         else:
             r_cameras1 = self.n_cameras
             r_cameras2 = int(self.m_stereo) * 3
+        self.updateParametersLabels(r_cameras1, r_cameras2,
+                                    self.camera_matrix, self.dist_coefs,
+                                    self.dev_camera_matrix,
+                                    self.dev_dist_coefs, self.R_stereo,
+                                    self.T_stereo)
         for j in range(r_cameras1):
-            float2StringVar(self.fx[j], self.camera_matrix[j][0][0])
-            float2StringVar(self.fy[j], self.camera_matrix[j][1][1])
-            float2StringVar(self.cx[j], self.camera_matrix[j][0][2])
-            float2StringVar(self.cy[j], self.camera_matrix[j][1][2])
-            float2StringVar(self.sd_fx[j], self.dev_camera_matrix[j][0][0])
-            float2StringVar(self.sd_fy[j], self.dev_camera_matrix[j][1][1])
-            float2StringVar(self.sd_cx[j], self.dev_camera_matrix[j][0][2])
-            float2StringVar(self.sd_cy[j], self.dev_camera_matrix[j][1][2])
-            float2StringVar(self.k1[j], self.dist_coefs[j][0][0])
-            float2StringVar(self.k2[j], self.dist_coefs[j][1][0])
-            float2StringVar(self.k3[j], self.dist_coefs[j][2][0])
-            float2StringVar(self.k4[j], self.dist_coefs[j][3][0])
-            float2StringVar(self.k5[j], self.dist_coefs[j][4][0])
-            float2StringVar(self.sd_k1[j], self.dev_dist_coefs[j][0][0])
-            float2StringVar(self.sd_k2[j], self.dev_dist_coefs[j][1][0])
-            float2StringVar(self.sd_k3[j], self.dev_dist_coefs[j][2][0])
-            float2StringVar(self.sd_k4[j], self.dev_dist_coefs[j][3][0])
-            float2StringVar(self.sd_k5[j], self.dev_dist_coefs[j][4][0])
             float2StringVar(self.rms_tk[j], self.rms[j])
+        if r_cameras2 > 2:
+            float2StringVar(self.rms_tk[2], self.rms[2])
+
+    def updateParametersLabels(self, r_cameras1, r_cameras2, camera_matrix,
+                               dist_coefs, dev_camera_matrix, dev_dist_coefs,
+                               R_stereo=None, T_stereo=None):
+        """Function to update the labels of the parameters of r_cameras1 cameras and r_cameras2 values of R and T."""
+        for j in range(r_cameras1):
+            float2StringVar(self.fx[j], camera_matrix[j][0][0])
+            float2StringVar(self.fy[j], camera_matrix[j][1][1])
+            float2StringVar(self.cx[j], camera_matrix[j][0][2])
+            float2StringVar(self.cy[j], camera_matrix[j][1][2])
+            float2StringVar(self.sd_fx[j], dev_camera_matrix[j][0][0])
+            float2StringVar(self.sd_fy[j], dev_camera_matrix[j][1][1])
+            float2StringVar(self.sd_cx[j], dev_camera_matrix[j][0][2])
+            float2StringVar(self.sd_cy[j], dev_camera_matrix[j][1][2])
+            float2StringVar(self.k1[j], dist_coefs[j][0][0])
+            float2StringVar(self.k2[j], dist_coefs[j][1][0])
+            float2StringVar(self.k3[j], dist_coefs[j][2][0])
+            float2StringVar(self.k4[j], dist_coefs[j][3][0])
+            float2StringVar(self.k5[j], dist_coefs[j][4][0])
+            float2StringVar(self.sd_k1[j], dev_dist_coefs[j][0][0])
+            float2StringVar(self.sd_k2[j], dev_dist_coefs[j][1][0])
+            float2StringVar(self.sd_k3[j], dev_dist_coefs[j][2][0])
+            float2StringVar(self.sd_k4[j], dev_dist_coefs[j][3][0])
+            float2StringVar(self.sd_k5[j], dev_dist_coefs[j][4][0])
         for j in range(r_cameras2):
-            if j == 2:
-                float2StringVar(self.rms_tk[j], self.rms[j])
-            float2StringVar(self.T_tk[j], self.T_stereo[j][0])
+            float2StringVar(self.T_tk[j], T_stereo[j][0])
             for i in range(3):
-                float2StringVar(self.R_tk[i][j], self.R_stereo[i][j])
+                float2StringVar(self.R_tk[i][j], R_stereo[i][j])
@@ -0,0 +1,433 @@
+"""Command line interface of the MRT Camera Calibration Toolbox.
+
+Runs the feature detection and the calibration of the toolbox without
+tkinter, matplotlib or PIL, e.g. on headless machines:
+
+    python -m toolboxClass.cli detect -p chessboard -W 9 -H 6 -d 50 -o features cam1/ [cam2/]
+    python -m toolboxClass.cli calibrate -k 50 -r 20 -o results.npz features/
+    python -m toolboxClass.cli export -o parameters/ results.npz
+    python -m toolboxClass.cli coverage -g 8 features/
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import numpy as np
+import toolboxClass.miscTools.datastring as datastring
+import toolboxClass.miscTools.detection_cache as detection_cache
+import toolboxClass.miscTools.detection_tools as detection_tools
+from toolboxClass.miscTools.calibration_tools import ClusterCalibration, get_calibration_flags, \
+    calibrate_with_uncertainty
+from toolboxClass.miscTools.heat_map import get_coverage
+from toolboxClass.miscTools.misc_tools import get_sorted_files
+from toolboxClass.miscTools.parallel_tools import get_default_workers
+from toolboxClass.miscTools.time_tools import chronometer
+
+VALID_FILES = ['.jpg', '.png']
+PATTERNS = {'chessboard': detection_tools.CHESSBOARD,
+            'asymmetric': detection_tools.ASYMMETRIC_GRID,
+            'symmetric': detection_tools.SYMMETRIC_GRID}
+# name of the file with the information of the detection
+DETECTION_FILE = 'detection.json'
+# seed of the subsets compared by --compare-stereo-modes if none is given
+COMPARE_SEED = 0
+
+
+def detect(args):
+    """Function to detect the features of the images in one folder per camera and save them as text files."""
+    if len(args.folders) > 2:
+        logging.error('At most two folders (stereo mode) are supported')
+        return 1
+    pattern = PATTERNS[args.pattern]
+    file_names = [get_sorted_files(folder, VALID_FILES)
+                  for folder in args.folders]
+    # for stereo mode, checks if the folders have the same number of files
+    if len(set(len(f) for f in file_names)) != 1 or not file_names[0]:
+        logging.error('The folders have to contain the same number of valid '
+                      'files')
+        return 1
+
+    cache_folder = None if args.no_cache else args.cache
+    time_detect = chronometer()
+    size = []
+    features = []
+    for j, names in enumerate(file_names):
+        size.append(None)
+        features.append([])
+        stats = detection_tools.VariantStatistics(pattern,
+                                                  args.adaptive_order)
+        detections = detection_tools.detect_in_files(names, pattern,
+                                                     args.height, args.width,
+                                                     n_workers=args.workers,
+                                                     cache_folder=cache_folder,
+                                                     pyramid=args.pyramid,
+                                                     statistics=[stats] * len(names))
+        for name, (im, f) in zip(names, detections):
+            # the first readable image initializes the image size
+            if im is not None and size[j] is None:
+                size[j] = im.shape
+            if im is None or im.shape != size[j]:
+                logging.warning('Invalid sized image: %s', name)
+                f = None
+            elif f is None:
+                logging.warning('Rejected image: %s', name)
+            features[j].append(f)
+        logging.info('Detection variants camera %d (%d read from cache)',
+                     j + 1, stats.from_cache)
+        for line in stats.summary():
+            logging.info('  %s', line)
+
+    # keep only the poses detected by all the cameras
+    valid = [i for i in range(len(file_names[0]))
+             if all(f[i] is not None for f in features)]
+    # without a readable image of each camera there is no image size
+    if not valid or any(s is None for s in size):
+        logging.error('No pose was detected in all the folders')
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+    object_pattern = detection_tools.get_object_pattern(pattern, args.width,
+                                                        args.height,
+                                                        args.distance)
+    np.savetxt(os.path.join(args.output, 'op.txt'),
+               object_pattern.reshape(-1), newline=',')
+    for j in range(len(file_names)):
+        path_folder = os.path.join(args.output, 'camera_%d' % (j + 1))
+        os.makedirs(path_folder, exist_ok=True)
+        for index, i in enumerate(valid):
+            np.savetxt(os.path.join(path_folder, 'f_%d.txt' % index),
+                       features[j][i].reshape(-1), newline=',')
+    with open(os.path.join(args.output, DETECTION_FILE), 'w') as f:
+        json.dump({'pattern': args.pattern,
+                   'width': args.width,
+                   'height': args.height,
+                   'distance': args.distance,
+                   'size': [list(s) for s in size],
+                   'files': [[names[i] for i in valid]
+                             for names in file_names]}, f, indent=2)
+    print('Imported: %d of %d poses (%0.2f s)' % (len(valid),
+                                                  len(file_names[0]),
+                                                  time_detect.gettime()))
+    return 0
+
+
+def load_detection(folder):
+    """Function to load the object points, image points and image sizes saved by detect."""
+    with open(os.path.join(folder, DETECTION_FILE)) as f:
+        info = json.load(f)
+    object_pattern = np.fromfile(os.path.join(folder, 'op.txt'),
+                                 dtype=np.float32, sep=',')
+    object_pattern = object_pattern.reshape((-1, 1, 3))
+    imgpoints = []
+    for j in range(len(info['size'])):
+        imgpoints.append([])
+        for index in range(len(info['files'][j])):
+            a = np.fromfile(os.path.join(folder, 'camera_%d' % (j + 1),
+                                         'f_%d.txt' % index),
+                            dtype=np.float32, sep=',')
+            imgpoints[j].append(a.reshape((int(len(a) / 2), 1, 2)))
+    size = [tuple(s) for s in info['size']]
+    return object_pattern, imgpoints, size, info
+
+
+def calibrate(args):
+    """Function to calibrate with subsets of the detected poses and save the results."""
+    object_pattern, imgpoints, size, info = load_detection(args.features)
+    n_total = len(imgpoints[0])
+    c_r = n_total if args.r is None else args.r
+    if c_r < 3 or c_r > n_total:
+        logging.error('r has to be between 3 and the number of poses (%d)',
+                      n_total)
+        return 1
+    flags = get_calibration_flags(args.intrinsics_guess,
+                                  args.fix_principal_point,
+                                  args.fix_aspect_ratio,
+                                  args.zero_tangent_dist)
+
+    if args.fast_uncertainty:
+        return calibrate_fast(args, object_pattern, imgpoints, size, flags)
+    if args.compare_stereo_modes:
+        if len(imgpoints) != 2:
+            logging.error('Comparing the stereo modes needs two cameras')
+            return 1
+        return compare_stereo_modes(args, object_pattern, imgpoints, size,
+                                    flags, c_r)
+
+    time_calibrate = chronometer()
+    calibration = ClusterCalibration([object_pattern] * n_total, imgpoints,
+                                     size, flags, args.k, c_r,
+                                     len(imgpoints) == 2, args.workers,
+                                     args.seed, args.warm_start,
+                                     args.tolerances, args.time_budget,
+                                     args.two_stage, args.save_subsets)
+    calibration.calibrate()
+    calibration.average()
+    if calibration.camera_matrix is None \
+            or np.any(calibration.camera_matrix[:, 0, 0] == 1):
+        logging.error('Calibration fails')
+        return 1
+
+    results = {'camera_matrix': calibration.camera_matrix,
+               'dist_coefs': calibration.dist_coefs,
+               'dev_camera_matrix': calibration.dev_camera_matrix,
+               'dev_dist_coefs': calibration.dev_dist_coefs}
+    if calibration.stereo:
+        results['R_stereo'] = calibration.R_stereo
+        results['T_stereo'] = calibration.T_stereo
+    if args.save_subsets:
+        results['rms_array'] = calibration.RMS_array
+        results['samples'] = calibration.samples
+        if calibration.stereo:
+            results['R_array'] = calibration.R_array
+            results['T_array'] = calibration.T_array
+    np.savez(args.output, **results)
+    n_calibrations = calibration.n_calibrated
+    print('Calibrations: %d selected of %d (%0.2f s)'
+          % (calibration.statistics.count, n_calibrations,
+             time_calibrate.gettime()))
+    print('Stopped by: %s' % calibration.stop_reason)
+    if args.warm_start:
+        print('Warm start: %0.2f s' % calibration.time_warm_start)
+    print('Subsets: %0.2f s (%0.4f s per subset)'
+          % (calibration.time_subsets,
+             calibration.time_subsets / max(n_calibrations, 1)))
+    for j in range(calibration.n_cameras):
+        print(datastring.instrinsic2string(calibration.camera_matrix[j],
+                                           calibration.dist_coefs[j]))
+    if calibration.stereo:
+        print(datastring.extrinsic2string(calibration.R_stereo,
+                                          calibration.T_stereo))
+    return 0
+
+
+def compare_stereo_modes(args, object_pattern, imgpoints, size, flags, c_r):
+    """Function to calibrate the same subsets with the joint and the two-stage stereo calibration and print their time and spread."""
+    n_total = len(imgpoints[0])
+    # both modes calibrate the same subsets, all k of them
+    seed = COMPARE_SEED if args.seed is None else args.seed
+    if args.tolerances is not None or args.time_budget is not None:
+        logging.warning('--tolerances and --time-budget are ignored when '
+                        'comparing the stereo modes')
+    names = ['fx', 'fy', 'cx', 'cy', 'k1', 'k2', 'k3', 'k4', 'k5']
+    names = ['%s_%d' % (name, j + 1) for j in range(2) for name in names] \
+        + ['Tx', 'Ty', 'Tz']
+    rows = []
+    for two_stage in (False, True):
+        time_calibrate = chronometer()
+        calibration = ClusterCalibration([object_pattern] * n_total,
+                                         imgpoints, size, flags, args.k, c_r,
+                                         True, args.workers, seed,
+                                         args.warm_start, None, None,
+                                         two_stage)
+        calibration.calibrate()
+        elapsed_time = time_calibrate.gettime()
+        n_calibrations = calibration.n_calibrated
+        calibration.average()
+        rows.append((two_stage, elapsed_time, n_calibrations,
+                     calibration.rms_statistics.mean,
+                     calibration.statistics.mean,
+                     calibration.statistics.std()))
+    print('Seed of the subsets: %d' % seed)
+    for two_stage, elapsed_time, n_calibrations, rms, _, _ in rows:
+        print('%-9s %0.2f s, %d subsets (%0.4f s per subset), mean rms '
+              '%0.5f' % ('two-stage' if two_stage else 'joint', elapsed_time,
+                         n_calibrations,
+                         elapsed_time / max(n_calibrations, 1), rms))
+    print('%-6s %14s %14s %14s %14s'
+          % ('', 'mean joint', 'std joint', 'mean two-stage',
+             'std two-stage'))
+    for i, name in enumerate(names):
+        print('%-6s %14.5f %14.5f %14.5f %14.5f'
+              % (name, rows[0][4][i], rows[0][5][i], rows[1][4][i],
+                 rows[1][5][i]))
+    return 0
+
+
+def calibrate_fast(args, object_pattern, imgpoints, size, flags):
+    """Function to calibrate all the poses once, with the standard deviations estimated by OpenCV, and save the results."""
+    n_total = len(imgpoints[0])
+    stereo = len(imgpoints) == 2
+    time_calibrate = chronometer()
+    rms, c, d, dev_c, dev_d, R, T, _, _, errors = \
+        calibrate_with_uncertainty([object_pattern] * n_total, imgpoints,
+                                   size, flags, stereo)
+    results = {'camera_matrix': np.array(c),
+               'dist_coefs': np.array(d),
+               'dev_camera_matrix': np.array(dev_c),
+               'dev_dist_coefs': np.array(dev_d),
+               'rms_array': np.array([rms]),
+               'errors': np.array(errors)}
+    if stereo:
+        results['R_stereo'] = R
+        results['T_stereo'] = T
+    np.savez(args.output, **results)
+    print('Calibration with all the poses, rms %0.5f (%0.2f s)'
+          % (rms, time_calibrate.gettime()))
+    for j in range(len(imgpoints)):
+        print(datastring.instrinsic2string(c[j], d[j]))
+        print('Standard deviations fx, fy, cx, cy: %s'
+              % ', '.join('%0.5f' % v for v in
+                          (dev_c[j][0][0], dev_c[j][1][1], dev_c[j][0][2],
+                           dev_c[j][1][2])))
+        print('Standard deviations k1...k5: %s'
+              % ', '.join('%0.5f' % v for v in np.ravel(dev_d[j])))
+    if stereo:
+        print(datastring.extrinsic2string(R, T))
+    return 0
+
+
+def export(args):
+    """Function to write the calibration results in the text format of the toolbox."""
+    results = np.load(args.results)
+    os.makedirs(args.output, exist_ok=True)
+    default_filenames = ['intrinsics_first_camera',
+                         'intrinsics_second_camera']
+    for j in range(len(results['camera_matrix'])):
+        with open(os.path.join(args.output, default_filenames[j] + '.txt'),
+                  'w') as f:
+            f.write(datastring.instrinsic2string(results['camera_matrix'][j],
+                                                 results['dist_coefs'][j]))
+    if 'R_stereo' in results:
+        with open(os.path.join(args.output, 'extrinsics.txt'), 'w') as f:
+            f.write(datastring.extrinsic2string(results['R_stereo'],
+                                                results['T_stereo']))
+    return 0
+
+
+def positive_int(value):
+    """Function to parse an integer argument greater than zero."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError('%s is not greater than zero' % value)
+    return number
+
+
+def coverage(args):
+    """Function to print the coverage of the image of each camera by the detected features."""
+    _, imgpoints, size, _ = load_detection(args.features)
+    results = []
+    for j in range(len(imgpoints)):
+        height, width = size[j][:2]
+        statistics = get_coverage(imgpoints[j], height, width,
+                                  min(args.grid_width, width))
+        counts = statistics['counts']
+        print('Camera %d: %d x %d cells' % (j + 1, counts.shape[1],
+                                            counts.shape[0]))
+        print('Cells with features: %0.1f %%' % statistics['cells_covered'])
+        print('Area covered: %0.1f %%' % statistics['area_covered'])
+        print('Features per cell:')
+        print('\n'.join(' '.join('%5d' % c for c in row) for row in counts))
+        statistics['counts'] = counts.tolist()
+        results.append(statistics)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    return 0
+
+
+def get_parser():
+    """Function to define the arguments of the command line interface."""
+    parser = argparse.ArgumentParser(prog='python -m toolboxClass.cli',
+                                     description='MRT Camera Calibration '
+                                                 'Toolbox without GUI')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='show information messages')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    p = subparsers.add_parser('detect', help='detect the pattern features '
+                                             'in the images')
+    p.add_argument('folders', nargs='+',
+                   help='image folder of each camera (two for stereo mode)')
+    p.add_argument('-p', '--pattern', choices=sorted(PATTERNS),
+                   default='chessboard')
+    p.add_argument('-W', '--width', type=int, required=True,
+                   help='pattern width')
+    p.add_argument('-H', '--height', type=int, required=True,
+                   help='pattern height')
+    p.add_argument('-d', '--distance', type=float, required=True,
+                   help='feature distance (mm)')
+    p.add_argument('-o', '--output', required=True,
+                   help='folder for the detected features')
+    p.add_argument('-j', '--workers', type=int, default=get_default_workers())
+    p.add_argument('--cache', default=detection_cache.get_default_cache_folder(),
+                   help='folder of the detection cache')
+    p.add_argument('--no-cache', action='store_true',
+                   help='detect all the images again')
+    p.add_argument('--pyramid', action='store_true',
+                   help='search the chessboard first in downscaled images '
+                        'larger than 1024 px (faster, the corners may differ '
+                        'slightly from the full resolution search)')
+    p.add_argument('--adaptive-order', action='store_true',
+                   help='try first the preprocessing variants that succeed '
+                        'most often (faster, the features of an image may '
+                        'depend on the images detected before)')
+    p.set_defaults(function=detect)
+
+    p = subparsers.add_parser('calibrate', help='calibrate with subsets of '
+                                                'the detected poses')
+    p.add_argument('features', help='folder written by detect')
+    p.add_argument('-k', type=positive_int, default=1, help='number of groups')
+    p.add_argument('-r', type=int, default=None,
+                   help='number of elements per group (default: all)')
+    p.add_argument('-o', '--output', required=True,
+                   help='.npz file for the results')
+    p.add_argument('-j', '--workers', type=int, default=get_default_workers())
+    p.add_argument('--seed', type=int, default=None,
+                   help='seed for drawing the subsets')
+    p.add_argument('--intrinsics-guess', action='store_true')
+    p.add_argument('--fix-principal-point', action='store_true')
+    p.add_argument('--fix-aspect-ratio', action='store_true')
+    p.add_argument('--zero-tangent-dist', action='store_true')
+    p.add_argument('--tolerances', type=float, nargs=3, default=None,
+                   metavar=('PX', 'DIST', 'T'),
+                   help='stop before k groups when the standard errors of '
+                        'fx, fy, cx, cy (px), k1...k5 and T (mm) are below '
+                        'these values')
+    p.add_argument('--time-budget', type=float, default=None,
+                   help='stop before k groups after this time (s)')
+    p.add_argument('--warm-start', action='store_true',
+                   help='start the subsets from a calibration with all the '
+                        'poses')
+    p.add_argument('--two-stage', action='store_true',
+                   help='stereo: calibrate the intrinsics of each camera '
+                        'first and then R and T with fixed intrinsics')
+    p.add_argument('--compare-stereo-modes', action='store_true',
+                   help='stereo: calibrate the same subsets with both modes '
+                        'and print their time and spread')
+    p.add_argument('--save-subsets', action='store_true',
+                   help='also save the rms, samples, R and T of each '
+                        'averaged subset')
+    p.add_argument('--fast-uncertainty', action='store_true',
+                   help='calibrate all the poses once and take the standard '
+                        'deviations estimated by OpenCV instead of the '
+                        'subsets')
+    p.set_defaults(function=calibrate)
+
+    p = subparsers.add_parser('export', help='write the calibration results '
+                                             'as text files')
+    p.add_argument('results', help='.npz file written by calibrate')
+    p.add_argument('-o', '--output', required=True,
+                   help='folder for the text files')
+    p.set_defaults(function=export)
+
+    p = subparsers.add_parser('coverage', help='print how much of the images '
+                                               'the detected features cover')
+    p.add_argument('features', help='folder written by detect')
+    p.add_argument('-g', '--grid-width', type=positive_int, default=8,
+                   help='number of columns of the grid of cells')
+    p.add_argument('-o', '--output', default=None,
+                   help='.json file for the statistics of each camera')
+    p.set_defaults(function=coverage)
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    logging.getLogger().setLevel(logging.INFO if args.verbose
+                                 else logging.WARNING)
+    return args.function(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# Running long tasks (importing, calibration) in a background thread while the
+# Tk main loop stays responsive
+import logging
+import queue
+import threading
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class BackgroundJob:
+    """Task running in a background thread, whose events are handled in the Tk main loop.
+
+    function(post, cancelled) runs in the thread: post(event) sends an event
+    to the main loop and cancelled is a threading.Event set by cancel().
+    The events are handled with on_event(events), a list of all the events
+    received since the last poll, and at the end on_done(result, error) is
+    called with the return value of function or the exception raised by it.
+    Both callbacks run in the Tk main loop, so only they may touch widgets.
+    """
+
+    def __init__(self, master, function, on_event=None, on_done=None,
+                 poll_ms=50):
+        self.master = master
+        self.function = function
+        self.on_event = on_event
+        self.on_done = on_done
+        self.poll_ms = poll_ms
+        self.cancelled = threading.Event()
+        self._queue = queue.Queue()
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Function to start the thread and the polling of its events."""
+        self._thread.start()
+        self.master.after(self.poll_ms, self._poll)
+        return self
+
+    def cancel(self):
+        """Function to ask the task to stop, on_done is still called when it does."""
+        self.cancelled.set()
+
+    def is_running(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        try:
+            self._result = self.function(self._queue.put, self.cancelled)
+        except Exception as e:
+            logging.exception('Background job failed')
+            self._error = e
+
+    def _poll(self):
+        # check if the thread finished before draining the queue, so no event
+        # posted at its end is lost
+        finished = not self._thread.is_alive()
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # the next poll is scheduled first, so an error in on_event does not
+        # stop the polling
+        if not finished:
+            self.master.after(self.poll_ms, self._poll)
+        if events and self.on_event is not None:
+            self.on_event(events)
+        if finished and self.on_done is not None:
+            self.on_done(self._result, self._error)
@@ -0,0 +1,503 @@
+# Calibration with subsets of the poses ("Clustering calculation"), kept free
+# of the GUI so the subsets can be calibrated in worker processes
+import collections
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from toolboxClass.miscTools.misc_tools import ncr, CombinationSampler, RunningPercentile
+from toolboxClass.miscTools.parallel_tools import ordered_map
+from toolboxClass.miscTools.quaternions import R_to_q, q_to_R
+from toolboxClass.miscTools.statistics_tools import RunningStatistics, \
+    RunningQuaternionMean
+from toolboxClass.miscTools.time_tools import chronometer
+
+logging.basicConfig(level=logging.ERROR)
+
+# minimum number of selected subsets before the convergence is checked
+MIN_SUBSETS = 5
+# number of values of each camera in the vector of get_parameters
+N_CAMERA_PARAMETERS = 9
+
+
+def get_calibration_flags(intrinsics_guess=False, fix_point=False,
+                          fix_ratio=False, zero_tangent_distance=False):
+    """Function to get the OpenCV flags of the calibration settings."""
+    return int(intrinsics_guess) * cv2.CALIB_USE_INTRINSIC_GUESS + \
+        int(fix_point) * cv2.CALIB_FIX_PRINCIPAL_POINT + \
+        int(fix_ratio) * cv2.CALIB_FIX_ASPECT_RATIO + \
+        int(zero_tangent_distance) * cv2.CALIB_ZERO_TANGENT_DIST
+
+
+def get_resolution_offset(size):
+    """Function to get the offset between the image coordinates of two cameras with different resolution.
+
+    Returns the index of the camera with the smaller images and the
+    adjustments (w_adj, h_adj) which center its coordinates in the bigger
+    images.
+    """
+    index_min = size.index(min(size))
+    index_max = size.index(max(size))
+    w_max, h_max = size[index_max]
+    w_min, h_min = size[index_min]
+    w_adj = (w_max - w_min) / 2
+    h_adj = (h_max - h_min) / 2
+    return index_min, w_adj, h_adj
+
+
+class ResolutionOffset:
+    """Offset which moves the image coordinates of the camera with the smaller images to the center of the bigger ones.
+
+    The image points are moved once when the calibration starts, and the
+    principal point calibrated in these coordinates is moved back with the
+    inverse offset.
+    """
+
+    def __init__(self, size):
+        self.index_min, w_adj, h_adj = get_resolution_offset(size)
+        # offset of the (x, y) coordinates of the image points
+        self.offset = np.array([h_adj, w_adj])
+
+    def shift_points(self, imgpoints):
+        """Function to get the image points of each camera with the points of the smaller camera moved."""
+        logging.debug('Transforming coordinates for camera %s',
+                      self.index_min + 1)
+        imgpoints = list(imgpoints)
+        ip = np.asarray(imgpoints[self.index_min])
+        imgpoints[self.index_min] = (ip + self.offset).astype(ip.dtype)
+        return imgpoints
+
+    def correct_camera_matrices(self, camera_matrices):
+        """Function to move back the principal point of the smaller camera, the matrices are changed in place."""
+        logging.debug('Correcting cx an cy for camera %s', self.index_min + 1)
+        camera_matrices[self.index_min][0][2] -= self.offset[0]
+        camera_matrices[self.index_min][1][2] -= self.offset[1]
+        return camera_matrices
+
+
+def get_offset(size, stereo):
+    """Function to get the ResolutionOffset of a stereo pair with different resolution, None if no offset is needed."""
+    if stereo and size[0] != size[1]:
+        logging.debug('Different camera resolution')
+        return ResolutionOffset(size)
+    return None
+
+
+def calibrate_camera(op, ip, width, height, c, d, flags):
+    """Function to calibrate the intrinsics of one camera, returns rms, camera matrix and distortion coefficients."""
+    rms, c, d, _, _ = cv2.calibrateCamera(op, ip, (width, height), c, d,
+                                          flags=flags)
+    return rms, c, d
+
+
+def calibrate_subset(op, ip, size, flags, stereo, guess=None,
+                     two_stage=False):
+    """Function to calibrate one subset of poses for one camera or a stereo pair.
+
+    op are the object points and ip the image points of each camera for the
+    poses of the subset, size the image size (height, width) of each camera.
+    For stereo pairs with different resolution, the image points have to be
+    moved first with ResolutionOffset.
+    guess are the initial camera matrices and distortion coefficients of each
+    camera (used with cv2.CALIB_USE_INTRINSIC_GUESS), by default the identity
+    and zero distortion.
+    With two_stage, the intrinsics of both stereo cameras are calibrated
+    first, each one in its own thread, and then only R and T with
+    cv2.CALIB_FIX_INTRINSIC, instead of calibrating all together.
+    Returns rms, the lists of camera matrices and distortion coefficients
+    and, for stereo, the rotation and translation between the cameras.
+    """
+    c, d = [], []
+    if guess is None:
+        for _ in ip:
+            c.append(np.eye(3, dtype=np.float32))
+            d.append(np.zeros((5, 1), dtype=np.float32))
+    else:
+        for c_j, d_j in zip(*guess):
+            c.append(np.array(c_j, dtype=np.float64))
+            d.append(np.array(d_j, dtype=np.float64))
+
+    R = None
+    T = None
+
+    if stereo:
+        width = max(size[0][1], size[1][1])
+        height = max(size[0][0], size[1][0])
+        if two_stage:
+            # OpenCV releases the GIL, so both cameras run at the same time
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                intrinsics = list(executor.map(
+                    lambda j: calibrate_camera(op, ip[j], width, height,
+                                               c[j], d[j], flags),
+                    range(2)))
+            for j, (_, c[j], d[j]) in enumerate(intrinsics):
+                c[j] = np.array(c[j], dtype=np.float64)
+                d[j] = np.array(d[j], dtype=np.float64)
+            flags |= cv2.CALIB_FIX_INTRINSIC
+        rms, c[0], d[0], c[1], d[1], R, T, _, _ = \
+            cv2.stereoCalibrate(op, ip[0], ip[1], c[0], d[0], c[1],
+                                d[1], (width, height),
+                                flags=flags)
+    else:
+        width = size[0][1]
+        height = size[0][0]
+        rms, c[0], d[0] = calibrate_camera(op, ip[0], width, height, c[0],
+                                           d[0], flags)
+
+    logging.info('this is stereo rms error: %s', rms)
+    return rms, c, d, R, T
+
+
+def calibrate_with_uncertainty(op, ip, size, flags, stereo):
+    """Function to calibrate all the poses once, with the standard deviations of the intrinsics estimated by OpenCV.
+
+    Each camera is calibrated with cv2.calibrateCameraExtended and, for
+    stereo, R and T are calibrated then with cv2.stereoCalibrateExtended
+    keeping these intrinsics. Returns rms, the lists of camera matrices,
+    distortion coefficients and their standard deviations, R and T (None
+    for one camera), the lists of rotation and translation vectors of the
+    poses of each camera and the list of RMS errors of each pose of each
+    camera.
+    """
+    # move coordinates when images size are different
+    offset = get_offset(size, stereo)
+    if offset is not None:
+        ip = offset.shift_points(ip)
+    width = max(s[1] for s in size)
+    height = max(s[0] for s in size)
+    c, d, dev_c, dev_d = [], [], [], []
+    rvecs, tvecs, errors = [], [], []
+    rms = None
+    for ip_j in ip:
+        rms, c_j, d_j, rvecs_j, tvecs_j, std, _, errors_j = \
+            cv2.calibrateCameraExtended(op, ip_j, (width, height),
+                                        np.eye(3), np.zeros((5, 1)),
+                                        flags=flags)
+        std = np.ravel(std)
+        dev_c_j = np.zeros((3, 3))
+        dev_c_j[0][0], dev_c_j[1][1], dev_c_j[0][2], dev_c_j[1][2] = std[:4]
+        c.append(c_j)
+        d.append(d_j.reshape(-1, 1)[:5])
+        dev_c.append(dev_c_j)
+        dev_d.append(std[4:9].reshape(5, 1))
+        rvecs.append(rvecs_j)
+        tvecs.append(tvecs_j)
+        errors.append(np.ravel(errors_j))
+    R = None
+    T = None
+    if stereo:
+        result = cv2.stereoCalibrateExtended(
+            op, ip[0], ip[1], c[0], d[0], c[1], d[1], (width, height),
+            None, None, flags=flags | cv2.CALIB_FIX_INTRINSIC)
+        rms, R, T = result[0], result[5], result[6]
+        # the per view errors are the last output in all OpenCV versions
+        errors = list(np.array(result[-1]).reshape(-1, 2).T)
+    # Correction for cx and cy parameters
+    if offset is not None:
+        offset.correct_camera_matrices(c)
+    logging.info('rms error with all the poses: %s', rms)
+    return rms, c, d, dev_c, dev_d, R, T, rvecs, tvecs, errors
+
+
+def get_parameters(c, d, T=None):
+    """Function to get the vector of fx, fy, cx, cy, k1...k5 of each camera and, for stereo, T of a calibration."""
+    parameters = []
+    for c_j, d_j in zip(c, d):
+        parameters += [c_j[0][0], c_j[1][1], c_j[0][2], c_j[1][2]]
+        parameters += list(np.ravel(d_j)[:5])
+    if T is not None:
+        parameters += list(np.ravel(T))
+    return np.array(parameters, dtype=np.float64)
+
+
+def get_tolerances(n_cameras, stereo, tolerance_px, tolerance_distortion,
+                   tolerance_translation):
+    """Function to get the tolerance of each value of get_parameters."""
+    tolerances = []
+    for _ in range(n_cameras):
+        tolerances += [tolerance_px] * 4 + [tolerance_distortion] * 5
+    if stereo:
+        tolerances += [tolerance_translation] * 3
+    return np.array(tolerances, dtype=np.float64)
+
+
+class ClusterCalibration:
+    """Calibrations of random subsets of r poses, averaged over k subsets within the RMS percentile.
+
+    Each subset is averaged when its RMS is within the percentile of the RMS
+    of the subsets calibrated until then, so only the running statistics of
+    the averaged subsets are kept, not the results of each one.
+    """
+
+    def __init__(self, objpoints, imgpoints, size, flags, k, r, stereo,
+                 n_workers=1, seed=None, warm_start=False, tolerances=None,
+                 time_budget=None, two_stage=False, keep_subsets=False):
+        """Init calibration, imgpoints and size are given for each camera, seed sets the random subsets.
+
+        With warm_start, all the poses are calibrated first and the subsets
+        start from its intrinsics instead of the identity. With tolerances
+        (pixels, distortion, translation) the calibration stops before k
+        subsets when the standard errors of the averaged parameters are
+        below them, and with time_budget (s) when it takes longer. With
+        two_stage, each stereo subset calibrates the intrinsics of the
+        cameras first and then R and T with fixed intrinsics. With
+        keep_subsets, the results and samples of the averaged subsets are
+        kept for the export (see average).
+        """
+        self.objpoints = objpoints
+        # move coordinates once when images size are different
+        self.offset = get_offset(size, stereo)
+        if self.offset is not None:
+            imgpoints = self.offset.shift_points(imgpoints)
+        self.imgpoints = imgpoints
+        self.size = size
+        self.flags = flags
+        self.stereo = stereo
+        self.n_cameras = len(imgpoints)
+        self.n_workers = n_workers
+        # n, number of all images
+        self.n = len(objpoints)
+        self.r = r
+        self.max_k = ncr(self.n, r)
+        self.k = min(k, self.max_k)
+        self.sampler = CombinationSampler(self.n, r, seed)
+        self.warm_start = warm_start
+        self.two_stage = two_stage
+        # intrinsics (camera matrices, distortion coefficients) where the
+        # subsets start, None for the identity
+        self.guess = None
+        # time (s) of the calibration with all the poses and of the subsets
+        self.time_warm_start = 0.0
+        self.time_subsets = 0.0
+        # early stopping
+        self.tolerances = None
+        if tolerances is not None:
+            self.tolerances = get_tolerances(self.n_cameras, stereo,
+                                             *tolerances)
+        self.time_budget = time_budget
+        # why the calibration stopped ('k', 'converged', 'time budget',
+        # 'cancelled' or 'all subsets')
+        self.stop_reason = None
+
+        # number of subsets calibrated
+        self.n_calibrated = 0
+        # running statistics of the parameters (vectors of get_parameters),
+        # rotations and RMS of the averaged subsets
+        self.statistics = RunningStatistics()
+        self.rotations = RunningQuaternionMean()
+        self.rms_statistics = RunningStatistics()
+        # RMS of the subsets calibrated, for the percentile
+        self.percentile = RunningPercentile()
+        # sample, parameters, R and RMS of each averaged subset, only with
+        # keep_subsets
+        self.keep_subsets = keep_subsets
+        self.subsets = []
+
+        # results of each averaged subset for the export, filled by average
+        self.samples = []
+        self.R_array = []
+        self.T_array = []
+        self.RMS_array = []
+
+        # averaged results
+        self.camera_matrix = None
+        self.dist_coefs = None
+        self.dev_camera_matrix = None
+        self.dev_dist_coefs = None
+        self.R_stereo = None
+        self.T_stereo = None
+        self.fx_array = [[], []]
+        self.fy_array = [[], []]
+        self.cx_array = [[], []]
+        self.cy_array = [[], []]
+        self.k1_array = [[], []]
+        self.k2_array = [[], []]
+        self.k3_array = [[], []]
+        self.k4_array = [[], []]
+        self.k5_array = [[], []]
+
+    def get_task(self, s):
+        """Function to get the arguments of calibrate_subset for the sample s."""
+        # select the object points of the sample
+        op = list(self.objpoints[i] for i in s)
+        # select the image points of the sample for each camera
+        ip = list(list(self.imgpoints[j][i] for i in s)
+                  for j in range(self.n_cameras))
+        flags = self.flags
+        if self.guess is not None:
+            flags |= cv2.CALIB_USE_INTRINSIC_GUESS
+        return op, ip, self.size, flags, self.stereo, self.guess, \
+            self.two_stage
+
+    def calibrate_all(self):
+        """Function to calibrate all the poses, its intrinsics are the initial guess of the subsets."""
+        time_warm_start = chronometer()
+        rms, c, d, _, _ = calibrate_subset(*self.get_task(range(self.n)))
+        self.time_warm_start = time_warm_start.gettime()
+        logging.info('warm start rms: %s (%0.2f s)', rms,
+                     self.time_warm_start)
+        if np.all(np.isfinite(np.array(c))) and \
+                np.all(np.isfinite(np.array(d))):
+            self.guess = (c, d)
+
+    def draw_samples(self):
+        """Generator of random samples, each one different from the samples already drawn."""
+        s = self.sampler.draw()
+        while s is not None:
+            yield s
+            s = self.sampler.draw()
+
+    def calibrate(self, progress=None, cancelled=None):
+        """Function to calibrate subsets until k of them are within the RMS percentile.
+
+        The subsets are calibrated in n_workers processes. Their results are
+        taken in the order the samples are drawn, so they are the same as
+        calibrating one subset after the other. progress(counter) is called
+        after each calibration with the number of averaged subsets. The
+        calibration stops early when the event cancelled is set or when all
+        the samples were calibrated.
+        """
+        if self.warm_start and self.guess is None:
+            self.calibrate_all()
+        time_subsets = chronometer()
+        self.stop_reason = 'all subsets'
+        if self.k == self.max_k:
+            # if k is the maximum possible, the samples are all the
+            # combinations in lexicographic order
+            samples = (list(c) for c in
+                       itertools.combinations(range(self.n), self.r))
+        else:
+            samples = self.draw_samples()
+        # the samples drawn ahead are kept until their results are used
+        drawn = collections.deque()
+
+        def get_tasks():
+            for s in samples:
+                drawn.append(s)
+                yield self.get_task(s)
+        results = ordered_map(calibrate_subset, get_tasks(), self.n_workers)
+        counter = 0
+        try:
+            while True:
+                result = next(results, None)
+                # stop when all the samples were calibrated
+                if result is None:
+                    break
+                sample = drawn.popleft()
+                self.n_calibrated += 1
+                self.add_result(sample, *result)
+                counter = self.statistics.count
+                if progress is not None:
+                    progress(counter)
+                # checks if desired number of calibrations is reached
+                if counter >= self.k:
+                    self.stop_reason = 'k'
+                    break
+                if self.is_converged():
+                    self.stop_reason = 'converged'
+                    break
+                if self.time_budget and \
+                        time_subsets.gettime() > self.time_budget:
+                    self.stop_reason = 'time budget'
+                    break
+                if cancelled is not None and cancelled.is_set():
+                    logging.info('Calibration cancelled')
+                    self.stop_reason = 'cancelled'
+                    break
+        finally:
+            # cancel the calibrations of the samples drawn ahead
+            results.close()
+        self.time_subsets = time_subsets.gettime()
+
+        logging.info('selected calibrations: %s', self.statistics.count)
+        logging.info('total calibrations: %s (%0.2f s)', self.n_calibrated,
+                     self.time_subsets)
+        logging.info('stopped by: %s', self.stop_reason)
+
+    def add_result(self, sample, rms, c, d, R, T):
+        """Function to add the result of a subset to the running statistics if its RMS is within the percentile."""
+        index = len(self.percentile)
+        entered, _ = self.percentile.add(rms)
+        # the subsets calibrated before are not averaged again when the
+        # percentile changes, their results are not kept
+        if index not in entered:
+            return
+        parameters = get_parameters(c, d, T)
+        self.statistics.add(parameters)
+        self.rms_statistics.add(rms)
+        if self.stereo:
+            self.rotations.add(R_to_q(R))
+        if self.keep_subsets:
+            self.subsets.append((sample, parameters, R, rms))
+
+    def is_converged(self):
+        """Function to check if the standard errors of all the averaged parameters are below the tolerances."""
+        if self.tolerances is None or self.statistics.count < MIN_SUBSETS:
+            return False
+        return bool(np.all(self.statistics.standard_error()
+                           <= self.tolerances))
+
+    def get_estimate(self):
+        """Function to get the averaged parameters of the subsets selected so far, from the running statistics.
+
+        Returns the camera matrices, distortion coefficients, their standard
+        deviations and, for stereo, R and T, or None if no subset is selected.
+        """
+        if self.statistics.count == 0:
+            return None
+        mean = self.statistics.mean
+        std = self.statistics.std()
+        camera_matrix = np.zeros((self.n_cameras, 3, 3))
+        dist_coefs = np.zeros((self.n_cameras, 5, 1))
+        dev_camera_matrix = np.zeros((self.n_cameras, 3, 3))
+        dev_dist_coefs = np.zeros((self.n_cameras, 5, 1))
+        for j in range(self.n_cameras):
+            start = j * N_CAMERA_PARAMETERS
+            for c, p in ((camera_matrix, mean), (dev_camera_matrix, std)):
+                c[j][0][0], c[j][1][1], c[j][0][2], c[j][1][2] = \
+                    p[start:start + 4]
+            camera_matrix[j][2][2] = 1
+            dist_coefs[j][:, 0] = mean[start + 4:start + 9]
+            dev_dist_coefs[j][:, 0] = std[start + 4:start + 9]
+        R = None
+        T = None
+        if self.stereo:
+            R = q_to_R(self.rotations.mean())
+            T = mean[-3:].reshape(3, 1)
+            # Correction for cx and cy parameters
+            if self.offset is not None:
+                self.offset.correct_camera_matrices(camera_matrix)
+        return camera_matrix, dist_coefs, dev_camera_matrix, \
+            dev_dist_coefs, R, T
+
+    def average(self):
+        """Function to get the averaged results and, with keep_subsets, the results of each averaged subset for the export."""
+        if self.subsets:
+            samples, parameters, R_array, RMS_array = zip(*self.subsets)
+            parameters = np.array(parameters)
+            for j in range(self.n_cameras):
+                start = j * N_CAMERA_PARAMETERS
+                self.fx_array[j] = parameters[:, start]
+                self.fy_array[j] = parameters[:, start + 1]
+                self.cx_array[j] = parameters[:, start + 2]
+                self.cy_array[j] = parameters[:, start + 3]
+                self.k1_array[j] = parameters[:, start + 4]
+                self.k2_array[j] = parameters[:, start + 5]
+                self.k3_array[j] = parameters[:, start + 6]
+                self.k4_array[j] = parameters[:, start + 7]
+                self.k5_array[j] = parameters[:, start + 8]
+            if self.stereo:
+                self.R_array = np.array(R_array)
+                self.T_array = parameters[:, -3:, np.newaxis]
+            self.RMS_array = np.array(RMS_array)
+            self.samples = np.array(samples)
+
+        # calculate parameters
+        estimate = self.get_estimate()
+        if estimate is not None:
+            self.camera_matrix, self.dist_coefs, self.dev_camera_matrix, \
+                self.dev_dist_coefs, R, T = estimate
+            if self.stereo:
+                self.R_stereo = R
+                self.T_stereo = T
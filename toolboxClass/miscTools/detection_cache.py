@@ -0,0 +1,75 @@
+# On-disk cache of the detected features, so importing the same images with
+# the same pattern again does not run the detection cascade again
+import hashlib
+import logging
+import os
+import tempfile
+import numpy as np
+
+logging.basicConfig(level=logging.ERROR)
+
+# version of the detection, it has to be increased each time the detection
+# changes its results, so the entries of older versions are not used
+DETECTOR_VERSION = 1
+# variant stored for the images where the pattern was not found
+FAILED = -1
+
+
+def get_default_cache_folder():
+    """Function to get the default folder of the cache, inside the cache folder of the user."""
+    folder = os.environ.get('XDG_CACHE_HOME')
+    if not folder:
+        folder = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(folder, 'mrt_calibration_toolbox', 'features')
+
+
+def get_key(data, pattern, p_height, p_width, settings=()):
+    """Function to get the key of an image from its file content, the pattern and the detector settings."""
+    h = hashlib.sha1(data)
+    h.update(repr((DETECTOR_VERSION, pattern, p_height, p_width)
+                  + tuple(settings)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def get_path(folder, key):
+    """Function to get the file of a cache entry, the entries are split in subfolders by their first characters."""
+    return os.path.join(folder, key[:2], key[2:] + '.npz')
+
+
+def load(folder, key):
+    """Function to read a cache entry.
+
+    Returns found, features and variant, where features and variant are None
+    if the pattern was not found in the image.
+    """
+    try:
+        with np.load(get_path(folder, key)) as entry:
+            variant = int(entry['variant'])
+            features = entry['features']
+    except (OSError, KeyError, ValueError):
+        return False, None, None
+    if variant == FAILED:
+        return True, None, None
+    return True, features, variant
+
+
+def store(folder, key, features, variant):
+    """Function to write a cache entry, variant None means that the pattern was not found."""
+    path = get_path(folder, key)
+    if features is None or variant is None:
+        features = np.zeros((0, 1, 2), np.float32)
+        variant = FAILED
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file and rename it, so other processes never
+        # read a half written entry
+        fd, tmp = tempfile.mkstemp(suffix='.npz', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, features=features, variant=variant)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    except OSError as e:
+        logging.warning('Detection cache not written: %s', e)
@@ -0,0 +1,341 @@
+# Detection of the pattern features in the images, kept free of the GUI so it
+# can run in worker processes
+import logging
+import time
+import cv2
+import numpy as np
+import toolboxClass.miscTools.detection_cache as detection_cache
+from toolboxClass.miscTools.parallel_tools import ordered_map
+
+logging.basicConfig(level=logging.ERROR)
+
+CHESSBOARD = 'chessboard'
+ASYMMETRIC_GRID = 'asymmetric grid'
+SYMMETRIC_GRID = 'symmetric grid'
+
+# preprocessing variants, in the order they are tried
+VARIANTS = ['Original image (Gray scale)',
+            'Original image + Inverting image',
+            'Normalized image (only)',
+            'Normalized image + Inverting image',
+            'Normalized image + Gaussian Blur',
+            'Normalized image + Gaussian Blur + Inverting image',
+            'Normalized image + Dilate',
+            'Normalized image + Dilate + Inverting image']
+
+
+def circle_kernel(L):
+    """Function to get a (2L+1, 2L+1) circle kernel, where the pixels within a radius of L - 1 from the center are 1."""
+    i, j = np.mgrid[-L:L + 1, -L:L + 1]
+    return ((i ** 2 + j ** 2) ** 0.5 <= L - 1).astype(np.uint8)
+
+
+# kernel for the dilate variants
+DILATE_KERNEL = circle_kernel(3)
+# the coarse-to-fine detection searches the pattern in the pyramid level
+# whose longer side is not bigger than this (pixels)
+PYRAMID_MAX_SIZE = 1024
+# termination criteria of the sub pixel refinement of the chessboard corners
+SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 130,
+                   0.25)
+
+
+def get_object_pattern(pattern, p_width, p_height, f_distance):
+    """Function to get the 3D points of the features of a pattern type."""
+    object_pattern = None
+    # creates object from Chessboard pattern
+    if pattern == CHESSBOARD:
+        object_pattern = np.zeros((p_width * p_height, 3), np.float32)
+        grid = np.mgrid[0:p_height, 0:p_width].T.reshape(-1, 2) * f_distance
+        object_pattern[:, 0] = -grid[:, 1]
+        object_pattern[:, 1] = grid[:, 0]
+    # creates object from Grid pattern
+    elif pattern == ASYMMETRIC_GRID:
+        pattern_size = (p_height, p_width)
+        object_pattern = np.zeros((np.prod(pattern_size), 3), np.float32)
+        object_pattern[:, :2] = np.fliplr(np.indices(pattern_size)
+                                          .T.reshape(-1, 2))
+        for i in range(np.prod(pattern_size)):
+            if object_pattern[i, 0] % 2 == 0:
+                object_pattern[i, 1] = object_pattern[i, 1] * f_distance
+                object_pattern[i, 0] = object_pattern[i, 0] * f_distance / 2
+            else:
+                object_pattern[i, 1] = object_pattern[i, 1] * f_distance \
+                                       + f_distance / 2
+                object_pattern[i, 0] = object_pattern[i, 0] * f_distance / 2
+    elif pattern == SYMMETRIC_GRID:
+        object_pattern = np.zeros((p_width * p_height, 3), np.float32)
+        grid = np.mgrid[0:p_height, 0:p_width].T.reshape(-1, 2) * f_distance
+        object_pattern[:, 0] = -grid[:, 1]
+        object_pattern[:, 1] = grid[:, 0]
+    return object_pattern
+
+
+def get_number_of_variants(pattern):
+    """Function to get how many preprocessing variants are tried for a pattern type."""
+    if pattern == SYMMETRIC_GRID:
+        return 8
+    return 4
+
+
+def preprocess(im, variant):
+    """Function to get the preprocessed image of a variant of the detection cascade."""
+    if variant < 2:
+        # creates copy of im, performance test found in
+        # https://stackoverflow.com/questions/48106028/ \
+        # python-copy-an-array-array
+        im2 = im * 1
+    elif variant < 4:
+        im2 = cv2.normalize(im, None, 0, 255, cv2.NORM_MINMAX)
+    elif variant < 6:
+        im2 = cv2.GaussianBlur(im * 1, (11, 11), 0)
+    else:
+        im2 = cv2.dilate(im * 1, DILATE_KERNEL, iterations=1)
+    # odd variants are the inverted image of the previous one
+    if variant % 2 == 1:
+        im2 = 255 - im2
+    return im2
+
+
+def find_pattern(im2, pattern, p_height, p_width):
+    """Function to find the features of the pattern in a preprocessed image."""
+    ret = False
+    features = None
+    # find features for chessboard pattern type
+    if pattern == CHESSBOARD:
+        ret, features = cv2.findChessboardCorners(im2, (p_height, p_width))
+        if ret:
+            # EPS realistisch einstellen je nach
+            # Bildaufloesung (z.B fuer (240x320) 0.1, 0.25)
+            # improve feature detection
+            cv2.cornerSubPix(im2, features, (3, 3), (-1, -1), SUBPIX_CRITERIA)
+    # find features for asymmetric grid pattern type
+    elif pattern == ASYMMETRIC_GRID:
+        features = np.array([], np.float32)
+        ret, features = cv2.findCirclesGrid(im2, (p_height, p_width),
+                                            features,
+                                            cv2.CALIB_CB_ASYMMETRIC_GRID)
+    # find features for symmetric grid pattern type
+    elif pattern == SYMMETRIC_GRID:
+        features = np.array([], np.float32)
+        # Since the findCirclesGrid algorithm for symmetric grid usually
+        # fails for a wrong height - width configuration, we invert here
+        # those parameters.
+        logging.debug('height - width')
+        ret, features = cv2.findCirclesGrid(im2, (p_height, p_width),
+                                            features,
+                                            cv2.CALIB_CB_SYMMETRIC_GRID)
+        if not ret:
+            logging.debug('width - height')
+            ret, features = cv2.findCirclesGrid(im2, (p_width, p_height),
+                                                features,
+                                                cv2.CALIB_CB_SYMMETRIC_GRID)
+            if ret:
+                # transform the detected features configuration to match the
+                # original (height, width)
+                features = features.reshape(p_height, p_width, 1, 2)
+                features = np.transpose(features, (1, 0, 2, 3))
+                features = features.reshape(p_width * p_height, 1, 2)
+    return ret, features
+
+
+def get_pyramid(im):
+    """Function to get the coarse pyramid level of an image for the coarse-to-fine detection.
+
+    Returns the level and its scale with respect to the image, or None and 1
+    if the image is already small.
+    """
+    scale = 1
+    level = im
+    while max(level.shape) > PYRAMID_MAX_SIZE:
+        level = cv2.pyrDown(level)
+        scale *= 2
+    if scale == 1:
+        return None, 1
+    return level, scale
+
+
+def find_pattern_coarse_to_fine(im, level, scale, variant, p_height,
+                                p_width):
+    """Function to find the chessboard corners in a pyramid level and refine them in the full resolution image."""
+    ret, features = cv2.findChessboardCorners(preprocess(level, variant),
+                                              (p_height, p_width))
+    if not ret:
+        return False, None
+    # pyrDown keeps the even pixels, so the coordinates are only scaled
+    features = features * scale
+    im2 = preprocess(im, variant)
+    # the window has to cover the error of the coarse corners first, then
+    # the corners are refined as in the full resolution detection
+    cv2.cornerSubPix(im2, features, (scale + 1, scale + 1), (-1, -1),
+                     SUBPIX_CRITERIA)
+    cv2.cornerSubPix(im2, features, (3, 3), (-1, -1), SUBPIX_CRITERIA)
+    return True, features
+
+
+def detect_features(im, pattern, p_height, p_width, pyramid=False,
+                    order=None, attempts=None):
+    """Function to detect the features of the pattern in a gray scale image.
+
+    The preprocessing variants are tried in the given order (by default their
+    index) until one succeeds. With pyramid, the chessboard is searched first
+    in a downscaled image (see get_pyramid) and the full resolution cascade
+    only runs if it fails there. If attempts is a list, (variant, seconds,
+    found) is appended to it for each variant tried.
+    Returns the features and the index of the successful variant, or None
+    and None if the pattern was not found.
+    """
+    if order is None:
+        order = range(get_number_of_variants(pattern))
+    if pyramid and pattern == CHESSBOARD:
+        level, scale = get_pyramid(im)
+        if level is not None:
+            for variant in order:
+                logging.debug('%s (1/%d)', VARIANTS[variant], scale)
+                t = time.perf_counter()
+                ret, features = find_pattern_coarse_to_fine(im, level, scale,
+                                                            variant, p_height,
+                                                            p_width)
+                if attempts is not None:
+                    attempts.append((variant, time.perf_counter() - t, ret))
+                if ret:
+                    return features, variant
+    for variant in order:
+        logging.debug(VARIANTS[variant])
+        t = time.perf_counter()
+        ret, features = find_pattern(preprocess(im, variant), pattern,
+                                     p_height, p_width)
+        if attempts is not None:
+            attempts.append((variant, time.perf_counter() - t, ret))
+        if ret:
+            return features, variant
+    return None, None
+
+
+class VariantStatistics:
+    """Successes and time of each preprocessing variant.
+
+    With adaptive, they are used to try first the variants that succeed
+    most often. The first variant that succeeds gives the features, so the
+    features of an image then depend on the images detected before it.
+    """
+
+    def __init__(self, pattern, adaptive=False):
+        self.adaptive = adaptive
+        n = get_number_of_variants(pattern)
+        self.hits = [0] * n
+        self.attempts = [0] * n
+        self.time = [0.0] * n
+        self.from_cache = 0
+        # successes of each variant read from the detection cache
+        self.cached_hits = [0] * n
+
+    def add(self, attempts):
+        """Function to add the attempts of one image, as returned by process_image."""
+        for variant, seconds, found in attempts:
+            if seconds is None:
+                # read from the cache, with the variant that succeeded
+                self.from_cache += 1
+                if variant is not None:
+                    self.cached_hits[variant] += 1
+                continue
+            self.attempts[variant] += 1
+            self.time[variant] += seconds
+            self.hits[variant] += int(found)
+
+    def get_order(self):
+        """Function to get the order of the variants, the most successful first and ties in the default order, None (the default order) if not adaptive."""
+        if not self.adaptive:
+            return None
+        return sorted(range(len(self.hits)),
+                      key=lambda v: -(self.hits[v] + self.cached_hits[v]))
+
+    def summary(self):
+        """Function to get one line per variant tried with its hit rate and time."""
+        lines = []
+        for v in range(len(self.hits)):
+            if self.attempts[v]:
+                lines.append('%s: %d/%d (%d %%), %0.2f s'
+                             % (VARIANTS[v], self.hits[v], self.attempts[v],
+                                100 * self.hits[v] // self.attempts[v],
+                                self.time[v]))
+            if self.cached_hits[v]:
+                lines.append('%s: %d from cache'
+                             % (VARIANTS[v], self.cached_hits[v]))
+        return lines
+
+
+def read_image(file_name):
+    """Function to read an image file as gray scale image, returns the image and the content of the file."""
+    try:
+        data = np.fromfile(file_name, dtype=np.uint8)
+    except OSError:
+        return None, None
+    if data.size == 0:
+        return None, data
+    return cv2.imdecode(data, cv2.IMREAD_GRAYSCALE), data
+
+
+def process_image(file_name, pattern, p_height, p_width, shape=None,
+                  cache_folder=None, pyramid=False, order=None):
+    """Function to read an image file and detect its features.
+
+    If shape is given, the detection is skipped for images of another size.
+    If cache_folder is given, the features are read from the detection cache
+    and the new detections are added to it. order is the order of the
+    preprocessing variants, None for the default order.
+    Returns the gray scale image (None if it can not be read), the detected
+    features (None if the detection fails or is skipped) and the attempts of
+    the detection (see detect_features). If the features were read from the
+    cache, the attempts are [(variant, None, found)] with the variant stored
+    with them (None if the pattern was not found).
+    """
+    attempts = []
+    im, data = read_image(file_name)
+    if im is None or (shape is not None and im.shape != tuple(shape)):
+        return im, None, attempts
+    if cache_folder is None:
+        features, _ = detect_features(im, pattern, p_height, p_width, pyramid,
+                                      order, attempts)
+        return im, features, attempts
+    # the key does not depend on the order of the variants, so the features
+    # detected first are kept for the image whatever the order is later
+    key = detection_cache.get_key(data, pattern, p_height, p_width,
+                                  (pyramid,))
+    found, features, variant = detection_cache.load(cache_folder, key)
+    if found:
+        return im, features, [(variant, None, features is not None)]
+    features, variant = detect_features(im, pattern, p_height, p_width,
+                                        pyramid, order, attempts)
+    detection_cache.store(cache_folder, key, features, variant)
+    return im, features, attempts
+
+
+def detect_in_files(file_names, pattern, p_height, p_width, shapes=None,
+                    n_workers=1, cache_folder=None, pyramid=False,
+                    statistics=None):
+    """Generator yielding the image and the features of each file, in the order of file_names.
+
+    The detections run in a pool of n_workers processes. shapes gives the
+    expected image size for each file (or None when it is not known yet).
+    statistics gives the VariantStatistics of each file (e.g. one per
+    camera), they set the order of the variants when the detection of the
+    file is started and are updated with its attempts.
+    Closing the generator cancels the pending detections.
+    """
+    if shapes is None:
+        shapes = [None] * len(file_names)
+    if statistics is None:
+        statistics = [VariantStatistics(pattern)] * len(file_names)
+    # the tasks are created when they are submitted, so each detection uses
+    # the statistics of the results received until then
+    tasks = ((f, pattern, p_height, p_width, s, cache_folder, pyramid,
+              stats.get_order())
+             for f, s, stats in zip(file_names, shapes, statistics))
+    results = ordered_map(process_image, tasks, n_workers)
+    try:
+        for stats, (im, features, attempts) in zip(statistics, results):
+            stats.add(attempts)
+            yield im, features
+    finally:
+        results.close()
@@ -0,0 +1,144 @@
+# Density cloud of the detected features, shown as heat map for each camera
+import cv2
+import numpy as np
+
+
+def get_circle_radius(width):
+    """Function to get the radius (pixels) of the circle of each feature, depending of the image width."""
+    return int(round(0.006 * width + 8))
+
+
+def get_circle_kernel(L):
+    """Function to get the circle matrix of radius L, from L in the center to 0 in the radius.
+
+    Each pixel gets the number of circles of radius k from 0 to L - 1
+    (and their squares) that contain it, so the matrix is the circle of
+    1.0 to 0.0 in steps of 1 / L, multiplied by L.
+    """
+    i, j = np.mgrid[0:2 * L + 1, 0:2 * L + 1]
+    r = np.sqrt((i - L) ** 2 + (j - L) ** 2)
+    # smallest radius k whose circle contains the pixel
+    k = np.maximum(np.ceil(r), np.maximum(abs(i - L), abs(j - L)))
+    return np.clip(L - k, 0, L).astype(np.int64)
+
+
+class DensityAccumulator:
+    """Density of the features of the views of one camera, updated when a view is added or removed.
+
+    The density is accumulated in a grid of grid_width columns (the image
+    width by default) with the aspect ratio of the image, the circle of
+    each feature is scaled with it. The circles are summed as integers, so
+    removing a view gives back exactly the density without it. The grid
+    has a border of 2 * L cells: the features up to L cells outside the
+    image (whose circle still reaches it) are added without clipping the
+    circle, the others are ignored.
+    """
+
+    def __init__(self, height, width, grid_width=None):
+        self.height = height
+        self.width = width
+        # at least one cell
+        self.grid_width = width if grid_width is None else max(grid_width, 1)
+        # grid cells per image pixel
+        self.scale = self.grid_width / float(width)
+        self.grid_height = max(int(round(height * self.scale)), 1)
+        self.radius = max(int(round(get_circle_radius(width) * self.scale)), 1)
+        self.kernel = get_circle_kernel(self.radius).astype(np.float64)
+        L = self.radius
+        self.grid = np.zeros((self.grid_height + 4 * L,
+                              self.grid_width + 4 * L), dtype=np.int64)
+        # number of features in each cell, with the border of L cells
+        self.cells = np.zeros((self.grid_height + 2 * L,
+                               self.grid_width + 2 * L), dtype=np.int64)
+        # number of features in each cell of the image
+        self.counts = self.cells[L:L + self.grid_height, L:L + self.grid_width]
+
+    def _points(self, features):
+        """Function to get the cell (row, column) of each feature, with a border of L cells."""
+        L = self.radius
+        points = np.reshape(features, (-1, 2)) * self.scale
+        x = points[:, 1].astype(int) + L
+        y = points[:, 0].astype(int) + L
+        inside = (x >= 0) & (x < self.grid_height + 2 * L) & \
+                 (y >= 0) & (y < self.grid_width + 2 * L)
+        return x[inside], y[inside]
+
+    def _spread(self, cells):
+        """Function to get the sum of the circles of the features counted in cells, with a border of L cells."""
+        # the circle is symmetric, so the correlation of filter2D is the sum
+        # of the circles centered in each cell. The sums are integers,
+        # rounding removes the error of the convolution
+        L = self.radius
+        cells = np.pad(cells.astype(np.float64), L)
+        grid = cv2.filter2D(cells, -1, self.kernel,
+                            borderType=cv2.BORDER_CONSTANT)
+        return np.rint(grid).astype(np.int64)
+
+    def _update(self, features, sign):
+        x, y = self._points(features)
+        if len(x) == 0:
+            return
+        L = self.radius
+        # count the features only in the cells of the view, the circle of
+        # the cell (x, y) starts in the corner (x, y) of the grid
+        x0, y0 = x.min(), y.min()
+        h, w = x.max() + 1 - x0, y.max() + 1 - y0
+        cells = np.bincount((x - x0) * w + (y - y0),
+                            minlength=h * w).reshape(h, w)
+        self.cells[x0:x0 + h, y0:y0 + w] += sign * cells
+        self.grid[x0:x0 + h + 2 * L, y0:y0 + w + 2 * L] += \
+            sign * self._spread(cells)
+
+    def build(self, features):
+        """Function to set the density to the features of all the views, with a single pass over the grid."""
+        self.cells[:] = 0
+        points = [self._points(f) for f in features if f is not None]
+        if points:
+            x = np.concatenate([p[0] for p in points])
+            y = np.concatenate([p[1] for p in points])
+            self.cells += np.bincount(
+                x * self.cells.shape[1] + y,
+                minlength=self.cells.size).reshape(self.cells.shape)
+        self.grid[:] = self._spread(self.cells)
+
+    def add(self, features):
+        """Function to add the features of a view to the density."""
+        self._update(features, 1)
+
+    def remove(self, features):
+        """Function to remove the features of a view added before from the density."""
+        self._update(features, -1)
+
+    def get_grid(self):
+        """Function to get the normalized density in the image, from 0.0 to 1.0."""
+        L = self.radius
+        grid = self.grid[2 * L:2 * L + self.grid_height,
+                         2 * L:2 * L + self.grid_width].astype(np.float64)
+        span = grid.max() - grid.min()
+        if span == 0:
+            return np.zeros_like(grid)
+        # normalized the picture
+        return (grid - grid.min()) / span
+
+    def coverage(self):
+        """Function to get the coverage statistics of the features, without rendering the heat map.
+
+        Returns a dict with the number of features in each cell of the grid
+        ('counts'), the percent of the cells with some feature
+        ('cells_covered') and the percent of the image reached by the
+        circle of some feature ('area_covered').
+        """
+        L = self.radius
+        grid = self.grid[2 * L:2 * L + self.grid_height,
+                         2 * L:2 * L + self.grid_width]
+        return {'counts': self.counts.copy(),
+                'cells_covered': 100.0 * np.count_nonzero(self.counts)
+                / self.counts.size,
+                'area_covered': 100.0 * np.count_nonzero(grid) / grid.size}
+
+
+def get_coverage(features, height, width, grid_width=None):
+    """Function to get the coverage statistics (see DensityAccumulator.coverage) of the features of the views of one camera."""
+    density = DensityAccumulator(height, width, grid_width)
+    density.build(features)
+    return density.coverage()
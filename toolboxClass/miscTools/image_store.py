@@ -0,0 +1,122 @@
+# Store of the imported images with a memory budget, the full resolution
+# images are read again from their files when they were dropped
+import logging
+from collections import OrderedDict
+import cv2
+from toolboxClass.miscTools.detection_tools import read_image
+
+logging.basicConfig(level=logging.ERROR)
+
+# default memory budget for the full resolution images of one camera (bytes)
+DEFAULT_BUDGET = 512 * 2 ** 20
+# size (width, height) of the previews shown in the panels of the tabs
+PREVIEW_SIZE = (320, 240)
+
+
+class _Entry:
+    """Image of the store: its file, preview and, if resident, the full resolution image."""
+    __slots__ = ('path', 'image', 'preview', 'nbytes', 'shape', 'missing')
+
+    def __init__(self, path, image, preview):
+        self.path = path
+        self.image = image
+        self.preview = preview
+        self.nbytes = 0 if image is None else image.nbytes
+        self.shape = None if image is None else image.shape
+        # the file can not be read again (moved, deleted or changed)
+        self.missing = False
+
+
+class ImageStore:
+    """List of the images of one camera, keeping at most budget bytes of full resolution images in memory.
+
+    The least recently used images are dropped first and read again from
+    their path when they are needed. Images without path (e.g. the empty
+    images of the text files mode) can not be read again and are always kept,
+    as are the previews. If the file can not be read again, the preview
+    scaled to the image size is used instead.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self._entries = []
+        # resident entries that can be dropped, the least recently used first
+        self._lru = OrderedDict()
+        self._resident_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        for i in range(len(self._entries)):
+            yield self[i]
+
+    def append(self, image, path=None):
+        """Function to add an image, path is the file from which it can be read again."""
+        preview = None
+        if image is not None:
+            preview = cv2.resize(image, PREVIEW_SIZE,
+                                 interpolation=cv2.INTER_AREA)
+        entry = _Entry(path, image, preview)
+        self._entries.append(entry)
+        if image is not None and path is not None:
+            self._add_resident(entry)
+
+    def __getitem__(self, index):
+        """Function to get the full resolution image, reading it again from its file if it was dropped."""
+        entry = self._entries[index]
+        if entry.missing:
+            return self._scaled_preview(entry)
+        if entry.image is None and entry.path is not None:
+            logging.debug('Reading again %s', entry.path)
+            image, _ = read_image(entry.path)
+            if image is None or image.shape != entry.shape:
+                logging.error('Image can not be read again, its preview is '
+                              'used: %s', entry.path)
+                entry.missing = True
+                return self._scaled_preview(entry)
+            entry.image = image
+            entry.nbytes = entry.image.nbytes
+            self._add_resident(entry)
+        elif id(entry) in self._lru:
+            self._lru.move_to_end(id(entry))
+        return entry.image
+
+    def _scaled_preview(self, entry):
+        height, width = entry.shape[:2]
+        return cv2.resize(entry.preview, (width, height),
+                          interpolation=cv2.INTER_LINEAR)
+
+    def __delitem__(self, index):
+        entry = self._entries.pop(index)
+        if self._lru.pop(id(entry), None) is not None:
+            self._resident_bytes -= entry.nbytes
+
+    def preview(self, index):
+        """Function to get the preview of an image, with the size of the panels of the tabs."""
+        return self._entries[index].preview
+
+    def set_budget(self, budget):
+        """Function to change the memory budget, dropping images if it is exceeded."""
+        self.budget = budget
+        self._drop()
+
+    def get_resident_bytes(self):
+        """Function to get the memory used by the full resolution images that can be dropped."""
+        return self._resident_bytes
+
+    def _add_resident(self, entry):
+        self._lru[id(entry)] = entry
+        self._resident_bytes += entry.nbytes
+        self._drop(keep=entry)
+
+    def _drop(self, keep=None):
+        # drop the least recently used images until the budget is met, the
+        # image just used is always kept
+        while self._resident_bytes > self.budget and self._lru:
+            key, entry = next(iter(self._lru.items()))
+            if entry is keep:
+                break
+            del self._lru[key]
+            entry.image = None
+            self._resident_bytes -= entry.nbytes
@@ -1,5 +1,10 @@
+import bisect
 import itertools
+import logging
+import math
 import operator as op
+import os
+import random
 from functools import reduce
 from numpy.random import permutation
 import numpy as np
@@ -11,7 +16,7 @@ def ncr(n, r):
     r = min(r, n - r)
     numer = reduce(op.mul, range(n, n - r, -1), 1)
     denom = reduce(op.mul, range(1, r + 1), 1)
-    return int(numer / denom)
+    return numer // denom
 
 
 def get_one_combination(n, r):
@@ -32,6 +37,66 @@ def get_all_combinations(n, r):
     return samples
 
 
+def unrank_combination(rank, n, r):
+    """Function to get the combination of r elements of range(n) at the position rank in lexicographic order."""
+    sample = []
+    x = 0
+    for i in range(r, 0, -1):
+        # skip the combinations starting with x while rank is not among them,
+        # c = comb(a, i - 1) is the number of combinations starting with x
+        a = n - x - 1
+        c = math.comb(a, i - 1)
+        while rank >= c:
+            rank -= c
+            x += 1
+            c = c * (a - i + 1) // a
+            a -= 1
+        sample.append(x)
+        x += 1
+    return sample
+
+
+class CombinationSampler:
+    """Random draws of combinations of r of n elements, without repeating any of them."""
+
+    def __init__(self, n, r, seed=None):
+        self.n = n
+        self.r = r
+        self.max_k = ncr(n, r)
+        self.random = random.Random(seed)
+        # positions of the drawn combinations in lexicographic order
+        self.seen = set()
+
+    def draw(self):
+        """Function to get a combination not drawn before, None if all of them were drawn."""
+        if len(self.seen) >= self.max_k:
+            return None
+        rank = self.random.randrange(self.max_k)
+        while rank in self.seen:
+            rank = self.random.randrange(self.max_k)
+        self.seen.add(rank)
+        return unrank_combination(rank, self.n, self.r)
+
+
+def get_sorted_files(folder, valid_files):
+    """Function to get the files of a folder with a valid extension, sorted by the number in their names."""
+    file_no_path = []
+    for f in os.listdir(folder):
+        ext = os.path.splitext(f)[1]
+        if ext.lower() not in valid_files:
+            continue
+        file_no_path.append(f)
+    try:
+        # sorting files, based on:
+        # https://stackoverflow.com/questions/33159106/
+        # sort-filenames-in-directory-in-ascending-order
+        file_no_path.sort(key=lambda f:
+                          int(''.join(filter(str.isdigit, f))))
+    except ValueError:
+        logging.warning('non-indexable filenames')
+    return [os.path.join(folder, f) for f in file_no_path]
+
+
 def validate(action, index, value_if_allowed, prior_value, text,
              validation_type, trigger_type, widget_name, allowed):
     """Function to check if entry value is correct."""
@@ -61,4 +126,79 @@ def get_indices_to_average(rms, percentile = 75):
     """Function to obtain array indices within percentile."""
     rms_max = np.percentile(rms, percentile)
     indices = [i for i,v in enumerate(rms) if v < rms_max]
-    return indices
\ No newline at end of file
+    # when all the values are equal (e.g. one calibration with all the
+    # images) none is below the percentile, so all of them are used
+    if not indices and len(rms) > 0 and np.min(rms) == rms_max:
+        indices = list(range(len(rms)))
+    return indices
+
+
+class RunningPercentile:
+    """Values below a percentile, kept up to date while values are added.
+
+    Gives the same selection as get_indices_to_average (linear interpolation
+    of np.percentile and strict comparison) after each value, with a binary
+    search instead of sorting all the values again.
+    """
+
+    def __init__(self, percentile=75):
+        self.percentile = percentile
+        # values in ascending order and the index of each one
+        self.values = []
+        self.indices = []
+        # number of values below the percentile, the first ones of values
+        self.count = 0
+        self.threshold = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def get_threshold(self):
+        """Function to get the percentile of the values, as np.percentile."""
+        n = len(self.values)
+        index = (n - 1) * (self.percentile / 100)
+        lo = min(max(int(math.floor(index)), 0), n - 1)
+        hi = min(lo + 1, n - 1)
+        t = index - lo
+        a = self.values[lo]
+        b = self.values[hi]
+        diff = b - a
+        # same interpolation as numpy, which is exact at both ends
+        if t >= 0.5:
+            return b - diff * (1 - t)
+        return a + diff * t
+
+    def add(self, value):
+        """Function to add the next value.
+
+        Returns the indices of the values that entered and that left the
+        selection because of it.
+        """
+        index = len(self.values)
+        position = bisect.bisect_right(self.values, value)
+        self.values.insert(position, value)
+        self.indices.insert(position, index)
+        old_count = self.count
+        self.threshold = self.get_threshold()
+        self.count = bisect.bisect_left(self.values, self.threshold)
+        # when all the values are equal none is below the percentile, so all
+        # of them are used
+        if self.count == 0 and self.values[0] == self.threshold:
+            self.count = len(self.values)
+
+        # the values before the new one keep their position, the ones after
+        # it moved one position, so the old values now selected are the
+        # first old_selected ones of the old order
+        old_selected = self.count if self.count <= position \
+            else self.count - 1
+        entered = [self.indices[q + (q >= position)]
+                   for q in range(old_count, old_selected)]
+        left = [self.indices[q + (q >= position)]
+                for q in range(old_selected, old_count)]
+        if position < self.count:
+            entered.append(index)
+        return entered, left
+
+    def get_selected(self):
+        """Function to get the indices of the values below the percentile, in the order they were added."""
+        return sorted(self.indices[:self.count])
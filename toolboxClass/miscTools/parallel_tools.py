@@ -0,0 +1,55 @@
+# Running independent tasks (feature detection, subset calibrations) in a
+# pool of worker processes while keeping the order of their results
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+
+
+def get_default_workers():
+    """Function to get the default number of worker processes."""
+    return os.cpu_count() or 1
+
+
+def init_worker():
+    """Function to initialize each worker process.
+
+    OpenCV runs its own thread pool inside each call, which would
+    oversubscribe the cores when several processes are working at once.
+    """
+    cv2.setNumThreads(1)
+
+
+def ordered_map(function, tasks, n_workers=1, window=None):
+    """Generator yielding function(*task) for each task, in the order of the tasks.
+
+    For n_workers > 1 the tasks run in a process pool, so function and the
+    task arguments have to be picklable. At most window tasks are pending at
+    any time, therefore tasks can be a lazy iterable and closing the generator
+    cancels the tasks not started yet.
+    """
+    if n_workers <= 1:
+        for task in tasks:
+            yield function(*task)
+        return
+
+    if window is None:
+        window = 2 * n_workers
+    # the pool is created from threads of the GUI (Tk, OpenCV), forking
+    # them could deadlock the workers, so they are started from scratch
+    executor = ProcessPoolExecutor(
+        max_workers=n_workers, initializer=init_worker,
+        mp_context=multiprocessing.get_context('spawn'))
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append(executor.submit(function, *task))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,53 @@
+# Cache of the pictures shown in the panels of the tabs, so going back to a
+# view does not draw it again
+from collections import OrderedDict
+
+# default memory budget of the cached pictures (bytes)
+DEFAULT_PICTURE_BUDGET = 64 * 2 ** 20
+
+
+class PictureCache:
+    """Pictures keyed by tuples, keeping at most budget bytes of them.
+
+    The least recently used pictures are dropped first. The entries whose
+    key starts with a given tuple (e.g. the camera and the view) can be
+    discarded when what they show changes.
+    """
+
+    def __init__(self, budget=DEFAULT_PICTURE_BUDGET):
+        self.budget = budget
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Function to get the picture of key, None if it is not cached."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, picture, nbytes):
+        """Function to add the picture of key, nbytes is its memory size."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        self._entries[key] = (picture, nbytes)
+        self._bytes += nbytes
+        # the last picture is kept even if it is over the budget
+        while self._bytes > self.budget and len(self._entries) > 1:
+            _, (_, n) = self._entries.popitem(last=False)
+            self._bytes -= n
+
+    def discard(self, prefix):
+        """Function to remove the pictures whose key starts with prefix."""
+        n = len(prefix)
+        for key in [k for k in self._entries if k[:n] == prefix]:
+            self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
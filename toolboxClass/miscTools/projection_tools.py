@@ -0,0 +1,109 @@
+# Projection of the pattern with the calibrated parameters, the poses of the
+# views are kept between projections so they are only refined when the
+# parameters change
+import logging
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class PoseCache:
+    """Poses (rotation and translation vectors) of the views of each camera, keyed by the file of the view.
+
+    Each pose is kept with the object points, the image points and the
+    camera parameters it was estimated with. It is used as it is while they
+    do not change, otherwise it is the initial guess of cv2.solvePnP (only
+    if the object points did not change).
+    """
+
+    def __init__(self, n_cameras=2):
+        self.poses = [{} for _ in range(n_cameras)]
+
+    def clear(self):
+        for poses in self.poses:
+            poses.clear()
+
+    def remove(self, j, key):
+        """Function to remove the pose of a view of camera j, e.g. when the view is deleted."""
+        self.poses[j].pop(key, None)
+
+    def set(self, j, keys, objpoints, imgpoints, rvecs, tvecs, camera_matrix,
+            dist_coefs):
+        """Function to store the poses of the views of camera j, e.g. the ones of the calibration."""
+        c = np.array(camera_matrix, dtype=np.float64)
+        d = np.array(dist_coefs, dtype=np.float64)
+        for key, op, ip, r, t in zip(keys, objpoints, imgpoints, rvecs, tvecs):
+            self.poses[j][key] = (np.array(op), np.array(ip), np.array(r),
+                                  np.array(t), c, d)
+
+    def get_poses(self, j, keys, objpoints, imgpoints, camera_matrix,
+                  dist_coefs):
+        """Function to get the poses of the views of camera j with the given camera parameters."""
+        c = np.array(camera_matrix, dtype=np.float64)
+        d = np.array(dist_coefs, dtype=np.float64)
+        rvecs, tvecs = [], []
+        for key, op, ip in zip(keys, objpoints, imgpoints):
+            cached = self.poses[j].get(key)
+            if cached is not None and not np.array_equal(cached[0], op):
+                # the pattern changed, the pose is not a good guess
+                cached = None
+            if cached is not None and np.array_equal(cached[1], ip) and \
+                    np.array_equal(cached[4], c) and \
+                    np.array_equal(cached[5], d):
+                r, t = cached[2], cached[3]
+            elif cached is not None:
+                # refine the pose of the previous parameters
+                _, r, t = cv2.solvePnP(op, ip, c, d, cached[2].copy(),
+                                       cached[3].copy(),
+                                       useExtrinsicGuess=True)
+            else:
+                _, r, t = cv2.solvePnP(op, ip, c, d)
+            self.poses[j][key] = (np.array(op), np.array(ip), r, t, c, d)
+            rvecs.append(r)
+            tvecs.append(t)
+        return rvecs, tvecs
+
+
+def get_stereo_transforms(R, T):
+    """Function to get the transformation (rotation, translation) from the coordinates of each camera to the other one."""
+    R = np.array(R, dtype=np.float64)
+    T = np.array(T, dtype=np.float64).reshape(3, 1)
+    R_inv = np.linalg.inv(R)
+    return [(R, T), (R_inv, -np.dot(R_inv, T))]
+
+
+def project_views(objpoints, rvecs, tvecs, camera_matrix, dist_coefs,
+                  transform=None):
+    """Function to project the pattern of each view, transform moves the poses to the coordinates of another camera."""
+    projected = []
+    for op, r, t in zip(objpoints, rvecs, tvecs):
+        if transform is not None:
+            R, T = transform
+            r = np.dot(R, cv2.Rodrigues(r)[0])
+            t = np.dot(R, t) + T
+        imgpoints, _ = cv2.projectPoints(op, r, t, camera_matrix,
+                                         dist_coefs)
+        projected.append(imgpoints)
+    return projected
+
+
+def get_reprojection_errors(imgpoints, projected):
+    """Function to get the RMS error of each view and the pixel distance error of each feature.
+
+    imgpoints and projected are the points of the N views, each one with
+    the P features of the pattern. Returns the array of N RMS errors and
+    the (N, P, 1) array of the distances between the features and their
+    projections.
+    """
+    imgpoints = np.asarray(imgpoints)
+    projected = np.asarray(projected)
+    distances = np.linalg.norm(imgpoints - projected, axis=-1)
+    rms = np.sqrt(np.mean(np.square(distances), axis=(1, 2)))
+    return rms, distances
+
+
+def get_rms(*errors):
+    """Function to get the RMS of the RMS errors of the views of one or more cameras."""
+    errors = np.concatenate(errors)
+    return np.sqrt(np.sum(np.square(errors)) / len(errors))
@@ -1,29 +1,25 @@
 import numpy as np
-import numpy.matlib as npm
 
 
 # https://github.com/christophhagen/averaging-quaternions/blob/master/averageQuaternions.py
 # Q is a Nx4 numpy matrix and contains the quaternions to average in the rows.
-# The quaternions are arranged as (w,x,y,z), with w being the scalar
+# The quaternions are arranged as (x,y,z,w), with w being the scalar
 # The result will be the average quaternion of the input. Note that the signs
 # of the output quaternion can be reversed, since q and -q describe the same orientation
-def averageQuaternions(Q):
-    # Number of quaternions to average
-    M = Q.shape[0]
-    A = npm.zeros(shape=(4, 4))
-
-    for q in Q:
-        # multiply q with its transposed version q' and add A
-        A += np.outer(q, q)
-
-    # scale
-    A = A / float(M)
-    # compute eigenvalues and -vectors
-    eigenValues, eigenVectors = np.linalg.eig(A)
-    # Sort by largest eigenvalue
-    eigenVectors = eigenVectors[:, eigenValues.argsort()[::-1]]
-    # return the real part of the largest eigenvector (has only real part)
-    return np.real(eigenVectors[:, 0].A1)
+def averageQuaternions(Q, weights=None):
+    Q = np.asarray(Q, dtype=np.float64).reshape(-1, 4)
+    if weights is None:
+        weights = np.ones(len(Q))
+    weights = np.asarray(weights, dtype=np.float64)
+    # move the quaternions to the hemisphere of the first one, it does not
+    # change the products q q' but keeps the input consistent
+    Q = Q * np.where(np.dot(Q, Q[0]) < 0, -1.0, 1.0)[:, np.newaxis]
+    # weighted sum of the products q q' of all quaternions, scaled
+    A = np.einsum('n,ni,nj->ij', weights, Q, Q) / np.sum(weights)
+    # the matrix is symmetric, its eigenvalues are sorted in ascending order
+    eigenValues, eigenVectors = np.linalg.eigh(A)
+    # return the eigenvector of the largest eigenvalue
+    return eigenVectors[:, -1]
 
 
 def q_to_R(q):
@@ -34,17 +30,40 @@ def q_to_R(q):
     return R
 
 
-def R_to_q(R):
-    q_r = np.sqrt(R[0, 0] + R[1, 1] + R[2, 2] + 1) / 2
-    q_v = np.array([[R[2, 1] - R[1, 2]], [R[0, 2] - R[2, 0]], [R[1, 0] - R[0, 1]]]) / (4 * q_r)
-    q = np.append(q_v, q_r)
+def Rs_to_q(R):
+    """Function to convert an array of N rotation matrices to the Nx4 array of their quaternions (x,y,z,w), with w >= 0.
+
+    Each quaternion is taken from its largest component (Shepperd's method),
+    so the conversion is also exact for rotations of about 180 degrees.
+    """
+    R = np.asarray(R, dtype=np.float64).reshape(-1, 3, 3)
+    trace = R[:, 0, 0] + R[:, 1, 1] + R[:, 2, 2]
+    # M[i][j] = 4 q_i q_j for the components (x,y,z,w)
+    M = np.empty((len(R), 4, 4))
+    M[:, 0, 0] = 1 + 2 * R[:, 0, 0] - trace
+    M[:, 1, 1] = 1 + 2 * R[:, 1, 1] - trace
+    M[:, 2, 2] = 1 + 2 * R[:, 2, 2] - trace
+    M[:, 3, 3] = 1 + trace
+    M[:, 0, 1] = M[:, 1, 0] = R[:, 0, 1] + R[:, 1, 0]
+    M[:, 0, 2] = M[:, 2, 0] = R[:, 0, 2] + R[:, 2, 0]
+    M[:, 1, 2] = M[:, 2, 1] = R[:, 1, 2] + R[:, 2, 1]
+    M[:, 0, 3] = M[:, 3, 0] = R[:, 2, 1] - R[:, 1, 2]
+    M[:, 1, 3] = M[:, 3, 1] = R[:, 0, 2] - R[:, 2, 0]
+    M[:, 2, 3] = M[:, 3, 2] = R[:, 1, 0] - R[:, 0, 1]
+    # row of the largest component, 4 q_i q / (2 q_i) = 2 q
+    i = np.argmax(np.diagonal(M, axis1=1, axis2=2), axis=1)
+    rows = M[np.arange(len(R)), i]
+    q = rows / (2 * np.sqrt(rows[np.arange(len(R)), i]))[:, np.newaxis]
+    # same sign as R_to_q, the scalar is not negative
+    q[q[:, 3] < 0] *= -1
     return q
 
 
-def averageMatrix(R):
-    Q = []
-    for r in R:
-        Q.append(R_to_q(r))
+def R_to_q(R):
+    return Rs_to_q(R)[0]
+
 
-    q_mean = averageQuaternions(np.array(Q))
+def averageMatrix(R, weights=None):
+    # weights of the rotations, e.g. the inverse of their RMS error
+    q_mean = averageQuaternions(Rs_to_q(R), weights)
     return q_to_R(q_mean)
@@ -0,0 +1,82 @@
+# Statistics updated one value at a time, used to follow the subset
+# calibrations while they run
+import numpy as np
+
+
+class RunningStatistics:
+    """Mean and variance of a set of arrays, updated with Welford's algorithm when arrays are added or removed."""
+
+    def __init__(self, shape=()):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def add(self, x):
+        """Function to add an array to the set."""
+        x = np.asarray(x, dtype=np.float64)
+        self.count += 1
+        delta = x - self.mean
+        self.mean = self.mean + delta / self.count
+        self.m2 = self.m2 + delta * (x - self.mean)
+
+    def remove(self, x):
+        """Function to remove an array added before from the set."""
+        x = np.asarray(x, dtype=np.float64)
+        if self.count <= 1:
+            self.count = 0
+            self.mean = np.zeros_like(self.mean)
+            self.m2 = np.zeros_like(self.m2)
+            return
+        self.count -= 1
+        delta = x - self.mean
+        self.mean = self.mean - delta / self.count
+        # rounding errors could make it slightly negative
+        self.m2 = np.maximum(self.m2 - delta * (x - self.mean), 0)
+
+    def variance(self):
+        """Function to get the (population) variance, as np.var."""
+        if self.count == 0:
+            return np.zeros_like(self.m2)
+        return self.m2 / self.count
+
+    def std(self):
+        """Function to get the (population) standard deviation, as np.std."""
+        return np.sqrt(self.variance())
+
+    def standard_error(self):
+        """Function to get the standard error of the mean, infinite for less than two arrays."""
+        if self.count < 2:
+            return np.full_like(self.m2, np.inf)
+        return np.sqrt(self.m2 / (self.count - 1) / self.count)
+
+
+class RunningQuaternionMean:
+    """Average of a set of quaternions, as averageQuaternions, kept as the sum of their outer products."""
+
+    def __init__(self):
+        self.count = 0
+        self.accumulator = np.zeros((4, 4))
+
+    def add(self, q):
+        """Function to add a quaternion to the set."""
+        q = np.ravel(q).astype(np.float64)
+        self.count += 1
+        self.accumulator += np.outer(q, q)
+
+    def remove(self, q):
+        """Function to remove a quaternion added before from the set."""
+        q = np.ravel(q).astype(np.float64)
+        self.count -= 1
+        if self.count <= 0:
+            self.count = 0
+            self.accumulator = np.zeros((4, 4))
+            return
+        self.accumulator -= np.outer(q, q)
+
+    def mean(self):
+        """Function to get the average quaternion, None for an empty set (q and -q are the same rotation)."""
+        if self.count == 0:
+            return None
+        # eigenvector of the largest eigenvalue, the matrix is symmetric
+        _, eigenvectors = np.linalg.eigh(self.accumulator / self.count)
+        return eigenvectors[:, -1]